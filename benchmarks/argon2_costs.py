@@ -0,0 +1,133 @@
+"""Login latency and throughput for a range of Argon2 time costs.
+
+    python -m benchmarks.argon2_costs --time-costs 1 2 3 4 --workers 4
+
+For each time cost, stores the user's password with it, sets the
+`ARGON2_*` settings to match so no login rehashes, and sends
+`--logins` logins, `--concurrency` at a time, through the app. Pick the
+highest cost whose p99 the login path can afford.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.models import User, table_registry
+from todo_list.security import (
+    get_password_hash,
+    get_password_hasher,
+    hash_executor,
+)
+from todo_list.settings import get_settings
+
+PASSWORD = 'argon2-password'
+EMAIL = 'bench@bench.com'
+
+
+def set_costs(url: str, time_cost: int, memory_cost: int, parallelism: int):
+    costs = {
+        'ARGON2_TIME_COST': time_cost,
+        'ARGON2_MEMORY_COST': memory_cost,
+        'ARGON2_PARALLELISM': parallelism,
+    }
+    for name, value in costs.items():
+        setattr(get_settings(), name, value)
+        # The hashing processes read their settings from the environment.
+        os.environ[name] = str(value)
+    get_password_hasher.cache_clear()
+    hash_executor.shutdown()
+
+    engine = create_engine(url)
+    with Session(engine) as session:
+        session.execute(
+            update(User).values(password=get_password_hash(PASSWORD))
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def logins(count: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+
+    async def login(client):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                '/auth/token', data={'username': EMAIL, 'password': PASSWORD}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        # Start the hashing processes before the clock does.
+        await login(client)
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(login(client) for _ in range(count)))
+        return latencies, time.perf_counter() - start
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--time-costs', type=int, nargs='+', default=[1, 2, 3, 4]
+    )
+    parser.add_argument(
+        '--memory-cost', type=int, default=settings.ARGON2_MEMORY_COST
+    )
+    parser.add_argument(
+        '--parallelism', type=int, default=settings.ARGON2_PARALLELISM
+    )
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{Path(tmp) / "argon2.db"}'
+        engine = create_engine(url)
+        table_registry.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(User(username='bench', email=EMAIL, password='-'))
+            session.commit()
+        engine.dispose()
+
+        settings.DATABASE_URL = url
+        database.get_engine.cache_clear()
+        hash_executor.workers = args.workers
+
+        print(f'{"time cost":>10}{"p50 ms":>10}{"p99 ms":>10}{"logins/s":>10}')
+        for time_cost in args.time_costs:
+            set_costs(url, time_cost, args.memory_cost, args.parallelism)
+            latencies, elapsed = asyncio.run(
+                logins(args.logins, args.concurrency)
+            )
+            p99 = statistics.quantiles(latencies, n=100, method='inclusive')[
+                98
+            ]
+            print(
+                f'{time_cost:>10}{statistics.median(latencies) * 1000:>10.1f}'
+                f'{p99 * 1000:>10.1f}{len(latencies) / elapsed:>10.1f}'
+            )
+
+        hash_executor.shutdown()
+        database.get_engine().dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Concurrent throughput of the sync (threadpool) and async stacks.
+
+    python -m benchmarks.concurrency --requests 2000 --concurrency 200
+
+Both stacks serve the same routes; only `DATABASE_ASYNC` and the engine
+change. Pass `--database-url`, with its sync driver, to run against a
+real server instead of the temporary SQLite file.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.models import Todo, TodoState, User, table_registry
+from todo_list.security import create_access_token
+from todo_list.settings import get_settings
+
+
+def seed(url: str, todos: int) -> str:
+    engine = create_engine(url)
+    table_registry.metadata.drop_all(engine)
+    table_registry.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = User(username='bench', email='bench@bench.com', password='-')
+        session.add(user)
+        session.flush()
+        session.add_all(
+            Todo(
+                title=f'todo {i}',
+                description='benchmark',
+                state=TodoState.todo,
+                user_id=user.id,
+            )
+            for i in range(todos)
+        )
+        session.commit()
+
+    engine.dispose()
+    return create_access_token(data={'sub': 'bench@bench.com'})
+
+
+async def run(path: str, token: str, requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    headers = {'Authorization': f'Bearer {token}'}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'rps': requests / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def bench(mode: str, url: str, args) -> dict:
+    get_settings().DATABASE_ASYNC = mode == 'async'
+    get_settings().DATABASE_URL = url
+    database.get_engine.cache_clear()
+    engine = database.get_engine()
+
+    result = asyncio.run(
+        run(args.path, args.token, args.requests, args.concurrency)
+    )
+
+    if mode == 'async':
+        asyncio.run(engine.dispose())
+    else:
+        engine.dispose()
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--todos', type=int, default=100)
+    parser.add_argument('--path', default='/todos/?limit=20')
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f'sqlite:///{Path(tmp) / "bench.db"}'
+        args.token = seed(url, args.todos)
+
+        for mode in ('sync', 'async'):
+            result = bench(mode, url, args)
+            print(
+                f'{mode:>5}: {result["rps"]:8.1f} req/s  '
+                f'p50 {result["p50_ms"]:7.1f} ms  '
+                f'p99 {result["p99_ms"]:7.1f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
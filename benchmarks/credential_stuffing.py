@@ -0,0 +1,163 @@
+"""Legitimate login latency while a botnet guesses one user's password.
+
+    python -m benchmarks.credential_stuffing --seconds 10 --rate 100
+
+Attackers spread over `--attacker-ips` addresses post `--rate` bad
+passwords a second for the victim's email, while a real user logs in
+from their own address every `--interval` seconds. Runs once with the
+login rate limiter disabled and once with the limits from `Settings`.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from http import HTTPStatus
+from itertools import count
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.models import User, table_registry
+from todo_list.security import (
+    email_limiter,
+    get_password_hash,
+    hash_executor,
+    hash_password,
+    ip_limiter,
+)
+from todo_list.settings import get_settings
+
+PASSWORD = 'stuffing-password'
+VICTIM = 'victim@bench.com'
+LEGIT = 'legit@bench.com'
+
+
+def seed(url: str):
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+    password = get_password_hash(PASSWORD)
+
+    with Session(engine) as session:
+        session.add_all(
+            User(username=email, email=email, password=password)
+            for email in (VICTIM, LEGIT)
+        )
+        session.commit()
+
+    engine.dispose()
+
+
+def client_from(ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 123))
+    return httpx.AsyncClient(transport=transport, base_url='http://bench')
+
+
+async def attack(rate: float, ips: int, done: asyncio.Event, statuses):
+    clients = [client_from(f'203.0.113.{i}') for i in range(ips)]
+
+    async def guess(client):
+        response = await client.post(
+            '/auth/token', data={'username': VICTIM, 'password': 'guess'}
+        )
+        statuses.append(response.status_code)
+
+    guesses = set()
+    for i in count():
+        if done.is_set():
+            break
+        task = asyncio.create_task(guess(clients[i % ips]))
+        guesses.add(task)
+        task.add_done_callback(guesses.discard)
+        await asyncio.sleep(1 / rate)
+
+    await asyncio.gather(*guesses)
+    for client in clients:
+        await client.aclose()
+
+
+async def legit_user(done: asyncio.Event, interval: float):
+    latencies, failures = [], 0
+    async with client_from('198.51.100.1') as client:
+        while not done.is_set():
+            start = time.perf_counter()
+            response = await client.post(
+                '/auth/token', data={'username': LEGIT, 'password': PASSWORD}
+            )
+            latencies.append(time.perf_counter() - start)
+            failures += response.status_code != HTTPStatus.OK
+            await asyncio.sleep(interval)
+    return latencies, failures
+
+
+async def run(args) -> dict:
+    # Start the hashing processes before the clock does.
+    await hash_password(PASSWORD)
+
+    done = asyncio.Event()
+    statuses = []
+    attackers = asyncio.create_task(
+        attack(args.rate, args.attacker_ips, done, statuses)
+    )
+    legit = asyncio.create_task(legit_user(done, args.interval))
+
+    await asyncio.sleep(args.seconds)
+    done.set()
+    await attackers
+    latencies, failures = await legit
+
+    return {
+        'logins': len(latencies),
+        'p50_ms': statistics.median(latencies) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'failures': failures,
+        'attempts': len(statuses),
+        'limited': statuses.count(HTTPStatus.TOO_MANY_REQUESTS),
+        'hashed': statuses.count(HTTPStatus.BAD_REQUEST),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--attacker-ips', type=int, default=8)
+    parser.add_argument('--interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{Path(tmp) / "stuffing.db"}'
+        seed(url)
+        get_settings().DATABASE_URL = url
+        database.get_engine.cache_clear()
+
+        print(
+            f'{"limiter":<10}{"logins":>8}{"p50 ms":>10}{"max ms":>10}'
+            f'{"failed":>8}{"attempts":>10}{"429s":>8}{"hashed":>8}'
+        )
+        for mode, maxsize in (
+            ('off', 0),
+            ('on', get_settings().LOGIN_RATE_LIMIT_SIZE),
+        ):
+            for limiter in (ip_limiter, email_limiter):
+                limiter.clear()
+                limiter.maxsize = maxsize
+            result = asyncio.run(run(args))
+            print(
+                f'{mode:<10}{result["logins"]:>8}{result["p50_ms"]:>10.2f}'
+                f'{result["max_ms"]:>10.2f}{result["failures"]:>8}'
+                f'{result["attempts"]:>10}'
+                f'{result["limited"]:>8}{result["hashed"]:>8}'
+            )
+
+        hash_executor.shutdown()
+        database.get_engine().dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import factory
+import factory.fuzzy
+
+from todo_list.models import Todo, TodoState, User
+
+
+class UserFactory(factory.Factory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'user{n}')
+    email = factory.LazyAttribute(lambda user: f'{user.username}@bench.com')
+    password = '-'
+
+
+class TodoFactory(factory.Factory):
+    class Meta:
+        model = Todo
+
+    title = factory.Faker('sentence', nb_words=4)
+    description = factory.Faker('text', max_nb_chars=120)
+    state = factory.fuzzy.FuzzyChoice(TodoState)
+    user_id = 1
@@ -0,0 +1,129 @@
+"""Latency of the todo router queries before and after the filter indexes.
+
+    python -m benchmarks.indexes --rows 2000000 --users 1000
+
+Seeds a SQLite file, times every query the todo routes issue with the
+indexes dropped, then creates them and times the same queries again.
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select, text
+
+from todo_list.models import Todo, TodoState, User, table_registry
+
+STATES = list(TodoState)
+
+
+def seed(engine, rows: int, users: int):
+    table_registry.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        for index in Todo.__table__.indexes:
+            index.drop(conn)
+
+        conn.execute(
+            insert(User),
+            [
+                {
+                    'username': f'user{i}',
+                    'email': f'user{i}@bench.com',
+                    'password': '-',
+                }
+                for i in range(1, users + 1)
+            ],
+        )
+
+        rng = random.Random(0)
+        chunk = 50_000
+        for start in range(0, rows, chunk):
+            conn.execute(
+                insert(Todo),
+                [
+                    {
+                        'title': f'todo {i}',
+                        'description': 'benchmark',
+                        'state': rng.choice(STATES),
+                        'user_id': rng.randint(1, users),
+                    }
+                    for i in range(start, min(start + chunk, rows))
+                ],
+            )
+
+
+def router_queries(rows: int, users: int):
+    user_id = users // 2
+    deep_id = rows - rows // 10
+    todo_id = rows // 3
+
+    return {
+        'show_todos': select(Todo)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .limit(101),
+        'show_todos?state': select(Todo)
+        .where(Todo.user_id == user_id, Todo.state == TodoState.trash)
+        .order_by(Todo.id)
+        .limit(101),
+        'show_todos?cursor (deep)': select(Todo)
+        .where(Todo.user_id == user_id, Todo.id > deep_id)
+        .order_by(Todo.id)
+        .limit(101),
+        'show_todos?offset (deep)': select(Todo)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .offset(rows // users - 100)
+        .limit(101),
+        'update_todo/delete_todo': select(Todo).where(
+            Todo.user_id == user_id, Todo.id == todo_id
+        ),
+    }
+
+
+def measure(engine, queries, repeat: int):
+    results = {}
+    with engine.connect() as conn:
+        for name, query in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(query).all()
+                timings.append(time.perf_counter() - start)
+            results[name] = statistics.median(timings) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f'sqlite:///{Path(tmp) / "indexes.db"}')
+        seed(engine, args.rows, args.users)
+        queries = router_queries(args.rows, args.users)
+
+        before = measure(engine, queries, args.repeat)
+
+        with engine.begin() as conn:
+            for index in Todo.__table__.indexes:
+                index.create(conn)
+            conn.execute(text('ANALYZE'))
+
+        after = measure(engine, queries, args.repeat)
+        engine.dispose()
+
+    print(f'{"query":<28}{"before ms":>12}{"after ms":>12}')
+    for name in queries:
+        print(f'{name:<28}{before[name]:>12.3f}{after[name]:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Todo read latency while a burst of logins hashes passwords.
+
+    python -m benchmarks.login_storm --logins 200 --storm 16 --workers 4
+
+Runs the same storm three times: hashing inline on the event loop (what a
+plain `async def` login would do), in the threadpool, and in the process
+pool used by `hash_password`/`verify_password`.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.models import Todo, TodoState, User, table_registry
+from todo_list.security import (
+    create_access_token,
+    get_password_hash,
+    hash_executor,
+)
+from todo_list.settings import get_settings
+
+PASSWORD = 'storm-password'
+
+
+def seed(url: str):
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = User(
+            username='bench',
+            email='bench@bench.com',
+            password=get_password_hash(PASSWORD),
+        )
+        session.add(user)
+        session.flush()
+        session.add_all(
+            Todo(
+                title=f'todo {i}',
+                description='benchmark',
+                state=TodoState.todo,
+                user_id=user.id,
+            )
+            for i in range(100)
+        )
+        session.commit()
+
+    engine.dispose()
+
+
+async def storm(client, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async def login():
+        async with semaphore:
+            response = await client.post(
+                '/auth/token',
+                data={'username': 'bench@bench.com', 'password': PASSWORD},
+            )
+            statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return statuses, time.perf_counter() - start
+
+
+async def reader(client, headers, done: asyncio.Event):
+    latencies = []
+    while not done.is_set():
+        start = time.perf_counter()
+        response = await client.get('/todos/?limit=20', headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+    return latencies
+
+
+async def reader_for(client, headers, seconds: float):
+    done = asyncio.Event()
+    asyncio.get_running_loop().call_later(seconds, done.set)
+    return await reader(client, headers, done)
+
+
+async def run(args):
+    token = create_access_token({'sub': 'bench@bench.com'})
+    headers = {'Authorization': f'Bearer {token}'}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        baseline = await reader_for(client, headers, seconds=1)
+
+        done = asyncio.Event()
+        read = asyncio.create_task(reader(client, headers, done))
+        statuses, elapsed = await storm(client, args.logins, args.storm)
+        done.set()
+        latencies = await read
+
+    hash_executor.shutdown()
+    latencies.sort()
+    return {
+        'idle_p50_ms': statistics.median(baseline) * 1000,
+        'read_p50_ms': statistics.median(latencies) * 1000,
+        'read_p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'logins_per_s': statuses.count(200) / elapsed,
+        'rejected': len(statuses) - statuses.count(200),
+    }
+
+
+async def inline(fn, *args):
+    return fn(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--storm', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    modes = {
+        'inline': (0, inline),
+        'threadpool': (0, hash_executor.run),
+        'process': (args.workers, hash_executor.run),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{Path(tmp) / "storm.db"}'
+        seed(url)
+        get_settings().DATABASE_ASYNC = False
+        get_settings().DATABASE_URL = url
+        database.get_engine.cache_clear()
+
+        print(
+            f'{"mode":<12}{"idle p50":>10}{"p50 ms":>10}{"p99 ms":>10}'
+            f'{"logins/s":>10}{"503s":>6}'
+        )
+        for mode, (workers, run_hash) in modes.items():
+            hash_executor.workers = workers
+            hash_executor.run = run_hash
+            result = asyncio.run(run(args))
+            print(
+                f'{mode:<12}{result["idle_p50_ms"]:>10.2f}'
+                f'{result["read_p50_ms"]:>10.2f}'
+                f'{result["read_p99_ms"]:>10.2f}'
+                f'{result["logins_per_s"]:>10.1f}{result["rejected"]:>6}'
+            )
+
+        database.get_engine().dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Cost of encoding list responses: validated ORM objects vs plain rows.
+
+    python -m benchmarks.serialization --items 1000 --repeat 200
+
+`validated` is what the list routes did before: ORM objects validated
+through the route's `response_model`, run through `jsonable_encoder` and
+encoded by the stdlib `JSONResponse`. `fast` is the current path: rows
+as dicts encoded by `FastJSONResponse`. Reports CPU time per response
+and encoded bytes per CPU second.
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.factories import TodoFactory, UserFactory
+from todo_list.app import app
+from todo_list.export import COLUMNS
+from todo_list.models import Todo, User, table_registry
+from todo_list.responses import FastJSONResponse
+
+USER_COLUMNS = (User.id, User.username, User.email)
+
+
+def seed(engine, items: int):
+    table_registry.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all(UserFactory.build_batch(items))
+        session.flush()
+        session.bulk_save_objects(TodoFactory.build_batch(items, user_id=1))
+        session.commit()
+
+
+def response_field(endpoint: str):
+    method, path = endpoint.split()
+    for route in app.routes:
+        if (
+            isinstance(route, APIRoute)
+            and route.path == path
+            and method in route.methods
+        ):
+            return route.secure_cloned_response_field
+    raise LookupError(endpoint)
+
+
+async def validated(field, key: str, objects):
+    content = await serialize_response(
+        field=field,
+        response_content={key: objects, 'next_cursor': None},
+        is_coroutine=True,
+    )
+    return JSONResponse(content).body
+
+
+async def fast(field, key: str, rows):
+    return FastJSONResponse({key: rows, 'next_cursor': None}).body
+
+
+def measure(encode, field, key, payload, repeat: int):
+    async def run():
+        size = 0
+        start = time.process_time()
+        for _ in range(repeat):
+            size = len(await encode(field, key, payload))
+        return size, time.process_time() - start
+
+    size, cpu = asyncio.run(run())
+    return {
+        'cpu_ms': cpu / repeat * 1000,
+        'bytes': size,
+        'mb_per_cpu_s': size * repeat / cpu / 1_000_000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://')
+    seed(engine, args.items)
+
+    with Session(engine) as session:
+        endpoints = {
+            'GET /todos/': (
+                'todos',
+                session.scalars(select(Todo)).all(),
+                [row._asdict() for row in session.execute(select(*COLUMNS))],
+            ),
+            'GET /users/': (
+                'users',
+                session.scalars(select(User)).all(),
+                [
+                    row._asdict()
+                    for row in session.execute(select(*USER_COLUMNS))
+                ],
+            ),
+        }
+
+        print(
+            f'{"endpoint":<14}{"mode":<11}{"cpu ms":>9}{"bytes":>10}'
+            f'{"MB/cpu-s":>10}'
+        )
+        for endpoint, (key, objects, rows) in endpoints.items():
+            field = response_field(endpoint)
+            for mode, encode, payload in (
+                ('validated', validated, objects),
+                ('fast', fast, rows),
+            ):
+                result = measure(encode, field, key, payload, args.repeat)
+                print(
+                    f'{endpoint:<14}{mode:<11}{result["cpu_ms"]:>9.3f}'
+                    f'{result["bytes"]:>10}{result["mb_per_cpu_s"]:>10.1f}'
+                )
+
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Import time and time to first request of the app, in fresh processes.
+
+    python -m benchmarks.startup --runs 10 --top 15
+
+Each run starts a new interpreter, imports `todo_list.app` and serves one
+`GET /users/` through the ASGI app, so nothing is warm. Reports the
+median of `--runs` for both, and with `--top` the modules with the
+largest cumulative import time according to `python -X importtime`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from todo_list.models import table_registry
+
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import httpx
+from todo_list import database, security
+from todo_list.app import app
+imported = time.perf_counter()
+lazy = (
+    database.get_engine.cache_info().currsize == 0
+    and security.get_password_hasher.cache_info().currsize == 0
+)
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://startup'
+    ) as client:
+        response = await client.get('/users/')
+    response.raise_for_status()
+
+asyncio.run(first_request())
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (time.perf_counter() - start) * 1000,
+    'lazy': lazy,
+}))
+"""
+
+
+def probe(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def import_profile(env: dict, top: int) -> list[tuple[int, str]]:
+    """Modules by cumulative import time in microseconds, slowest first."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import todo_list.app'],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.removeprefix('import time:').split('|')
+        modules.append((int(cumulative), module.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{Path(tmp) / "startup.db"}'
+        engine = create_engine(url)
+        table_registry.metadata.create_all(engine)
+        engine.dispose()
+        env = os.environ | {'DATABASE_URL': url}
+
+        runs = [probe(env) for _ in range(args.runs)]
+        profile = import_profile(env, args.top) if args.top else []
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    first_ms = statistics.median(run['first_request_ms'] for run in runs)
+    print(f'import todo_list.app  {import_ms:8.1f} ms')
+    print(f'first request         {first_ms:8.1f} ms')
+    print(f'lazy engine/hasher    {all(run["lazy"] for run in runs)}')
+
+    if profile:
+        print(f'\n{"cumulative ms":>14}  module')
+        for cumulative, module in profile:
+            print(f'{cumulative / 1000:>14.1f}  {module}')
+
+
+if __name__ == '__main__':
+    main()
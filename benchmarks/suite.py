@@ -0,0 +1,405 @@
+"""Latency and throughput of every route against a seeded dataset.
+
+    python -m benchmarks.suite --users 200 --todos 50 --output base.json
+    python -m benchmarks.suite --compare base.json --max-regression 0.2
+
+Seeds users and todos with factory-boy, runs `--iterations` requests per
+route through the ASGI app and writes p50/p99/mean latency, throughput
+and error counts as JSON. With `--compare`, exits non-zero when the p50
+of any route regressed by more than `--max-regression`.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.factories import TodoFactory, UserFactory
+from todo_list import database
+from todo_list.app import app
+from todo_list.counters import reconcile_counters
+from todo_list.models import Todo, User, table_registry
+from todo_list.pagination import encode_token
+from todo_list.security import (
+    create_access_token,
+    get_password_hash,
+    hash_executor,
+)
+from todo_list.settings import get_settings
+
+PASSWORD = 'bench-password'
+INTERNAL_TOKEN = 'bench-internal-token'
+INTERNAL_HEADERS = {'Authorization': f'Bearer {INTERNAL_TOKEN}'}
+# Responses that never end; they have no latency to measure.
+UNBOUNDED = {'GET /todos/stream'}
+
+
+@dataclass
+class Dataset:
+    users: list[int]
+    emails: dict[int, str]
+    todos: dict[int, list[int]]
+    tokens: dict[int, str]
+    search_term: str
+
+    @property
+    def actor(self) -> int:
+        return self.users[0]
+
+    def auth(self, user_id: int | None = None) -> dict:
+        token = self.tokens[user_id or self.actor]
+        return {'Authorization': f'Bearer {token}'}
+
+
+def seed(url: str, users: int, todos_per_user: int) -> Dataset:
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+    password = get_password_hash(PASSWORD)
+
+    with Session(engine) as session:
+        session.add_all(UserFactory.build_batch(users, password=password))
+        session.flush()
+        user_ids = list(session.scalars(select(User.id).order_by(User.id)))
+
+        for user_id in user_ids:
+            session.bulk_save_objects(
+                TodoFactory.build_batch(todos_per_user, user_id=user_id)
+            )
+        session.commit()
+
+        emails = dict(session.execute(select(User.id, User.email)).all())
+        todos = {user_id: [] for user_id in user_ids}
+        for user_id, todo_id in session.execute(
+            select(Todo.user_id, Todo.id).order_by(Todo.id)
+        ):
+            todos[user_id].append(todo_id)
+        title = session.scalar(select(Todo.title).limit(1)) or 'todo'
+
+    with engine.begin() as connection:
+        reconcile_counters(connection)
+    engine.dispose()
+
+    return Dataset(
+        users=user_ids,
+        emails=emails,
+        todos=todos,
+        tokens={
+            user_id: create_access_token(data={'sub': email})
+            for user_id, email in emails.items()
+        },
+        search_term=title.split()[0].strip('.'),
+    )
+
+
+def scenarios(data: Dataset) -> dict:
+    """One request builder per route, keyed by `METHOD path`.
+
+    Read-only routes come first; routes that delete rows run last and
+    pick a different victim on every iteration.
+    """
+    actor = data.actor
+    others = data.users[1:] or [actor]
+    todo = {'title': 'Bench', 'description': 'Bench', 'state': 'todo'}
+
+    def delete_todo(i):
+        owner = others[i % len(others)]
+        todo_id = data.todos[owner][
+            (i // len(others)) % len(data.todos[owner])
+        ]
+        return {
+            'method': 'DELETE',
+            'url': f'/todos/{todo_id}',
+            'headers': data.auth(owner),
+        }
+
+    def delete_user(i):
+        victim = data.users[-(i % len(others)) - 1]
+        return {
+            'method': 'DELETE',
+            'url': f'/users/{victim}',
+            'headers': data.auth(victim),
+        }
+
+    return {
+        'GET /': lambda i: {'method': 'GET', 'url': '/'},
+        'GET /users/': lambda i: {'method': 'GET', 'url': '/users/'},
+        'GET /users/{id}': lambda i: {
+            'method': 'GET',
+            'url': f'/users/{data.users[i % len(data.users)]}',
+        },
+        'GET /todos/': lambda i: {
+            'method': 'GET',
+            'url': '/todos/',
+            'headers': data.auth(),
+        },
+        'GET /todos/search': lambda i: {
+            'method': 'GET',
+            'url': '/todos/search',
+            'params': {'q': data.search_term},
+            'headers': data.auth(),
+        },
+        'GET /todos/export': lambda i: {
+            'method': 'GET',
+            'url': '/todos/export',
+            'headers': data.auth(),
+        },
+        'GET /todos/stats': lambda i: {
+            'method': 'GET',
+            'url': '/todos/stats',
+            'headers': data.auth(),
+        },
+        'GET /todos/changes': lambda i: {
+            'method': 'GET',
+            'url': '/todos/changes',
+            # Seeded users are at version 1: an up-to-date client.
+            'params': {'since': encode_token(version=1)},
+            'headers': data.auth(),
+        },
+        'GET /internal/pool': lambda i: {
+            'method': 'GET',
+            'url': '/internal/pool',
+            'headers': INTERNAL_HEADERS,
+        },
+        'GET /internal/metrics': lambda i: {
+            'method': 'GET',
+            'url': '/internal/metrics',
+            'headers': INTERNAL_HEADERS,
+        },
+        'POST /auth/token': lambda i: {
+            'method': 'POST',
+            'url': '/auth/token',
+            'data': {'username': data.emails[actor], 'password': PASSWORD},
+        },
+        'POST /auth/refresh-token': lambda i: {
+            'method': 'POST',
+            'url': '/auth/refresh-token',
+            'headers': data.auth(),
+        },
+        'POST /users/': lambda i: {
+            'method': 'POST',
+            'url': '/users/',
+            'json': {
+                'username': f'new{i}',
+                'email': f'new{i}@bench.com',
+                'password': PASSWORD,
+            },
+        },
+        'POST /users/import': lambda i: {
+            'method': 'POST',
+            'url': '/users/import',
+            'headers': data.auth(),
+            'content': json.dumps({
+                'username': f'imported{i}',
+                'email': f'imported{i}@bench.com',
+                'password': PASSWORD,
+            }),
+        },
+        'PUT /users/{id}': lambda i: {
+            'method': 'PUT',
+            'url': f'/users/{actor}',
+            'headers': data.auth(),
+            'json': {
+                'username': f'actor{i}',
+                'email': data.emails[actor],
+                'password': PASSWORD,
+            },
+        },
+        'POST /todos/': lambda i: {
+            'method': 'POST',
+            'url': '/todos/',
+            'headers': data.auth(),
+            'json': todo,
+        },
+        'PATCH /todos/{id}': lambda i: {
+            'method': 'PATCH',
+            'url': f'/todos/{data.todos[actor][i % len(data.todos[actor])]}',
+            'headers': data.auth(),
+            'json': {'title': f'Bench {i}'},
+        },
+        'POST /todos/batch': lambda i: {
+            'method': 'POST',
+            'url': '/todos/batch',
+            'headers': data.auth(),
+            'json': {
+                'operations': [{'op': 'create', 'todo': todo}] * 5
+                + [
+                    {'op': 'update', 'id': todo_id, 'todo': {'state': 'done'}}
+                    for todo_id in data.todos[actor][:5]
+                ]
+            },
+        },
+        'DELETE /todos/{id}': delete_todo,
+        'DELETE /users/{id}': delete_user,
+    }
+
+
+def check_coverage(builders: dict) -> None:
+    routes = {
+        f'{method} {route.path}'
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    } - UNBOUNDED
+    missing = routes - builders.keys()
+    unknown = builders.keys() - routes
+
+    if missing or unknown:
+        sys.exit(
+            f'benchmark scenarios out of date; missing: {sorted(missing)}, '
+            f'unknown: {sorted(unknown)}'
+        )
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int) -> dict:
+    latencies = sorted(latencies)
+    p99 = statistics.quantiles(latencies, n=100, method='inclusive')[98]
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': p99 * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'rps': len(latencies) / elapsed,
+    }
+
+
+async def measure(client, build, iterations: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    pending = iter(range(iterations))
+
+    async def worker():
+        nonlocal errors
+        for i in pending:
+            request = build(i)
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            errors += response.is_error
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run(data: Dataset, args) -> dict:
+    builders = scenarios(data)
+    check_coverage(builders)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        for name, build in builders.items():
+            if args.routes and name not in args.routes:
+                continue
+            iterations = args.iterations
+            if name == 'DELETE /users/{id}':
+                iterations = min(iterations, len(data.users) - 1)
+            results[name] = await measure(
+                client, build, iterations, args.concurrency
+            )
+            print(format_row(name, results[name]), flush=True)
+
+    hash_executor.shutdown()
+    return results
+
+
+def format_row(name: str, result: dict) -> str:
+    return (
+        f'{name:<26}{result["p50_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+        f'{result["mean_ms"]:>9.2f}{result["rps"]:>9.1f}'
+        f'{result["errors"]:>7}'
+    )
+
+
+def compare(results: dict, baseline_path: Path, max_regression: float):
+    baseline = json.loads(baseline_path.read_text())['routes']
+    regressions = []
+
+    print(f'\n{"route":<26}{"base p50":>10}{"p50":>10}{"change":>9}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['p50_ms'], result['p50_ms']
+        change = after / before - 1
+        print(f'{name:<26}{before:>10.2f}{after:>10.2f}{change:>+9.1%}')
+        if change > max_regression:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--todos', type=int, default=50, help='per user')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--route', dest='routes', action='append')
+    parser.add_argument('--database-url')
+    parser.add_argument('--async', dest='use_async', action='store_true')
+    parser.add_argument('--output', type=Path, default='bench_results.json')
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f'sqlite:///{Path(tmp) / "suite.db"}'
+        data = seed(url, args.users, args.todos)
+
+        settings = get_settings()
+        settings.ADMIN_EMAILS = [data.emails[data.actor]]
+        settings.INTERNAL_TOKEN = INTERNAL_TOKEN
+        settings.DATABASE_ASYNC = args.use_async
+        settings.DATABASE_URL = url
+        database.get_engine.cache_clear()
+
+        print(
+            f'{"route":<26}{"p50 ms":>9}{"p99 ms":>9}{"mean ms":>9}'
+            f'{"req/s":>9}{"errors":>7}'
+        )
+        results = asyncio.run(run(data, args))
+
+        if args.use_async:
+            asyncio.run(database.get_engine().dispose())
+        else:
+            database.get_engine().dispose()
+
+    args.output.write_text(
+        json.dumps(
+            {
+                'meta': {
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'database': url.split(':', 1)[0],
+                    'async': args.use_async,
+                    'users': args.users,
+                    'todos_per_user': args.todos,
+                    'iterations': args.iterations,
+                    'concurrency': args.concurrency,
+                },
+                'routes': results,
+            },
+            indent=2,
+        )
+    )
+
+    if args.compare and compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Time to delete a user with many todos, ORM cascade vs ON DELETE CASCADE.
+
+    python -m benchmarks.user_delete --todos 1000 10000 100000
+
+For each todo count, seeds a SQLite file and deletes the user twice:
+once the way `cascade='all, delete-orphan'` did, loading every todo
+into the session and deleting it by primary key, and once leaving the
+todos to the foreign key.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from todo_list.database import enable_sqlite_foreign_keys
+from todo_list.models import Todo, TodoState, User, table_registry
+
+
+def seed(engine, todos: int) -> int:
+    with engine.begin() as conn:
+        user_id = conn.scalar(
+            insert(User)
+            .values(username='bench', email='bench@bench.com', password='-')
+            .returning(User.id)
+        )
+        chunk = 50_000
+        for start in range(0, todos, chunk):
+            conn.execute(
+                insert(Todo),
+                [
+                    {
+                        'title': f'todo {i}',
+                        'description': 'benchmark',
+                        'state': TodoState.done,
+                        'user_id': user_id,
+                    }
+                    for i in range(start, min(start + chunk, todos))
+                ],
+            )
+    return user_id
+
+
+def delete_with_orm(session: Session, user_id: int) -> int:
+    user = session.get(User, user_id)
+    for todo in user.todos:
+        session.delete(todo)
+    session.delete(user)
+    return len(user.todos) + 1
+
+
+def delete_with_cascade(session: Session, user_id: int) -> int:
+    session.delete(session.get(User, user_id))
+    return 1
+
+
+def measure(engine, todos: int, delete) -> tuple[float, int]:
+    user_id = seed(engine, todos)
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        objects = delete(session, user_id)
+        session.commit()
+        elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        assert conn.scalar(select(Todo.id).limit(1)) is None
+    return elapsed * 1000, objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--todos', type=int, nargs='+', default=[1000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    print(f'{"todos":>8}{"mode":>10}{"ms":>12}{"loaded":>10}')
+    for todos in args.todos:
+        for mode, delete in (
+            ('orm', delete_with_orm),
+            ('cascade', delete_with_cascade),
+        ):
+            with tempfile.TemporaryDirectory() as tmp:
+                engine = create_engine(f'sqlite:///{Path(tmp) / "delete.db"}')
+                enable_sqlite_foreign_keys(engine)
+                table_registry.metadata.create_all(engine)
+                elapsed, objects = measure(engine, todos, delete)
+                engine.dispose()
+            print(f'{todos:>8}{mode:>10}{elapsed:>12.1f}{objects:>10}')
+
+
+if __name__ == '__main__':
+    main()
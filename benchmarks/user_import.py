@@ -0,0 +1,105 @@
+"""Users created per second, one POST /users/ at a time vs the bulk import.
+
+    python -m benchmarks.user_import --users 500 --workers 1 2 4
+
+Creates `--users` accounts in a fresh SQLite file through the API one
+request after another, as onboarding scripts do, then through the
+import pipeline with each number of `--workers` hashing processes.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.cli import positive_int, run_import
+from todo_list.database import enable_sqlite_foreign_keys
+from todo_list.hashing import HashingExecutor
+from todo_list.models import table_registry
+from todo_list.security import hash_executor
+from todo_list.settings import get_settings
+from todo_list.user_import import parse_users
+
+
+def users(count: int) -> list[dict]:
+    return [
+        {
+            'username': f'user{i}',
+            'email': f'user{i}@bench.com',
+            'password': f'password{i}',
+        }
+        for i in range(count)
+    ]
+
+
+async def post_one_by_one(rows: list[dict]) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        for row in rows:
+            response = await client.post('/users/', json=row)
+            response.raise_for_status()
+
+
+def fresh_engine(tmp: str, name: str):
+    url = f'sqlite:///{Path(tmp) / name}.db'
+    engine = create_engine(url)
+    enable_sqlite_foreign_keys(engine)
+    table_registry.metadata.create_all(engine)
+    return url, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument(
+        '--workers',
+        type=positive_int,
+        nargs='+',
+        default=[1, os.cpu_count() or 1],
+    )
+    args = parser.parse_args()
+    rows = users(args.users)
+    text = '\n'.join(json.dumps(row) for row in rows)
+
+    print(f'{"mode":<24}{"seconds":>10}{"users/s":>10}')
+    with tempfile.TemporaryDirectory() as tmp:
+        url, engine = fresh_engine(tmp, 'api')
+        engine.dispose()
+        get_settings().DATABASE_URL = url
+        database.get_engine.cache_clear()
+        start = time.perf_counter()
+        asyncio.run(post_one_by_one(rows))
+        elapsed = time.perf_counter() - start
+        hash_executor.shutdown()
+        database.get_engine().dispose()
+        print(
+            f'{"POST /users/":<24}{elapsed:>10.2f}{len(rows) / elapsed:>10.1f}'
+        )
+
+        for workers in args.workers:
+            _, engine = fresh_engine(tmp, f'import{workers}')
+            executor = HashingExecutor(workers=workers, queue_depth=0)
+            start = time.perf_counter()
+            created, failed = asyncio.run(
+                run_import(engine, parse_users(text, 'ndjson'), executor)
+            )
+            elapsed = time.perf_counter() - start
+            executor.shutdown()
+            engine.dispose()
+            assert (created, failed) == (len(rows), 0)
+            mode = f'import, {workers} workers'
+            print(f'{mode:<24}{elapsed:>10.2f}{created / elapsed:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
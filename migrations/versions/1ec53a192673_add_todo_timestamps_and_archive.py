@@ -0,0 +1,115 @@
+"""add todo timestamps and archive
+
+Revision ID: 1ec53a192673
+Revises: d53fc0a83dd4
+Create Date: 2026-10-18 17:29:48.423547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '1ec53a192673'
+down_revision: Union[str, None] = 'd53fc0a83dd4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The SQLite search DDL as of this revision.
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert
+    AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete
+    AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+
+
+def timestamp_columns() -> list[sa.Column]:
+    return [
+        sa.Column(name, sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False)
+        for name in ('created_at', 'updated_at')
+    ]
+
+
+def add_timestamps() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        for column in timestamp_columns():
+            op.add_column('todos', column)
+        return
+
+    # SQLite cannot ALTER TABLE ADD a column defaulting to CURRENT_TIMESTAMP,
+    # so the table is rebuilt there; the rebuild drops the search triggers.
+    with op.batch_alter_table('todos', recreate='always') as batch_op:
+        for column in timestamp_columns():
+            batch_op.add_column(column)
+    for statement in SQLITE_DDL:
+        op.execute(statement)
+
+
+def drop_timestamps() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_column('todos', 'updated_at')
+        op.drop_column('todos', 'created_at')
+        return
+
+    with op.batch_alter_table('todos', recreate='always') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
+    for statement in SQLITE_DDL:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('todos_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    # The todostate type already exists; `todos` created it.
+    sa.Column('state', postgresql.ENUM('draft', 'todo', 'doing', 'done', 'trash', name='todostate', create_type=False), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_todos_archive_user_id_id', 'todos_archive', ['user_id', 'id'], unique=False)
+    # ### end Alembic commands ###
+    add_timestamps()
+
+
+def downgrade() -> None:
+    drop_timestamps()
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_todos_archive_user_id_id', table_name='todos_archive')
+    op.drop_table('todos_archive')
+    # ### end Alembic commands ###
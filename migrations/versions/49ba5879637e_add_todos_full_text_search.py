@@ -0,0 +1,84 @@
+"""add todos full-text search
+
+Revision ID: 49ba5879637e
+Revises: 3f392eb13992
+Create Date: 2026-10-18 16:48:31.056928
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '49ba5879637e'
+down_revision: Union[str, None] = '3f392eb13992'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The search DDL as of this revision.
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert
+    AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete
+    AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+POSTGRES_DDL = (
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_search ON todos
+    USING gin (to_tsvector('simple', title || ' ' || description))
+    """,
+)
+SQLITE_DROP_DDL = (
+    'DROP TRIGGER IF EXISTS todos_fts_insert',
+    'DROP TRIGGER IF EXISTS todos_fts_delete',
+    'DROP TRIGGER IF EXISTS todos_fts_update',
+    'DROP TABLE IF EXISTS todos_fts',
+)
+POSTGRES_DROP_DDL = ('DROP INDEX IF EXISTS ix_todos_search',)
+
+
+def install_search() -> None:
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}
+    for statement in ddl.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def uninstall_search() -> None:
+    ddl = {'sqlite': SQLITE_DROP_DDL, 'postgresql': POSTGRES_DROP_DDL}
+    for statement in ddl.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    install_search()
+
+
+def downgrade() -> None:
+    uninstall_search()
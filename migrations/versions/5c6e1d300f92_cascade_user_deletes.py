@@ -0,0 +1,98 @@
+"""cascade user deletes
+
+Revision ID: 5c6e1d300f92
+Revises: 81cbdb9a7c44
+Create Date: 2026-10-18 17:52:01.258372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5c6e1d300f92'
+down_revision: Union[str, None] = '81cbdb9a7c44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The search DDL as of this revision.
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert
+    AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete
+    AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+POSTGRES_DDL = (
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_search ON todos
+    USING gin (to_tsvector('simple', title || ' ' || description))
+    """,
+)
+
+TABLES = ('todos', 'todos_archive', 'todo_counters', 'todo_tombstones')
+# SQLite foreign keys are unnamed; batch mode names them when reflecting.
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def install_search() -> None:
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}
+    for statement in ddl.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def user_foreign_key(table: str) -> str:
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if foreign_key['referred_table'] == 'users':
+            return foreign_key['name'] or f'fk_{table}_user_id_users'
+
+
+def set_user_ondelete(ondelete: str | None) -> None:
+    for table in TABLES:
+        name = user_foreign_key(table)
+        with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                name, 'users', ['user_id'], ['id'], ondelete=ondelete
+            )
+
+    # Rebuilding `todos` on SQLite drops the search triggers.
+    install_search()
+
+
+def upgrade() -> None:
+    set_user_ondelete('CASCADE')
+
+
+def downgrade() -> None:
+    set_user_ondelete(None)
@@ -0,0 +1,81 @@
+"""stop reusing todo ids
+
+Revision ID: e7dd2f45b767
+Revises: 5c6e1d300f92
+Create Date: 2026-10-18 18:31:45.937205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7dd2f45b767'
+down_revision: Union[str, None] = '5c6e1d300f92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The search triggers as of this revision.
+SQLITE_SEARCH_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert
+    AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete
+    AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def rebuild_todos(autoincrement: bool) -> None:
+    # The rebuild drops the search triggers.
+    with op.batch_alter_table(
+        'todos',
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': autoincrement},
+    ):
+        pass
+    for statement in SQLITE_SEARCH_DDL:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    # Only SQLite reuses ids; sequences elsewhere never go back.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    rebuild_todos(True)
+    # Ids already archived or deleted stay retired.
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'todos'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) "
+        "SELECT 'todos', coalesce(max(id), 0) FROM ("
+        "SELECT id FROM todos UNION ALL "
+        "SELECT id FROM todos_archive UNION ALL "
+        "SELECT todo_id FROM todo_tombstones)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    rebuild_todos(False)
@@ -1,4 +1,4 @@
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
 
 import pytest
@@ -8,18 +8,61 @@ from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 
 from todo_list.app import app
-from todo_list.database import get_session
+from todo_list.database import (
+    ThreadedSession,
+    enable_sqlite_foreign_keys,
+    get_session,
+    get_session_factory,
+)
 from todo_list.models import User, table_registry
-from todo_list.security import get_password_hash
+from todo_list.security import (
+    email_limiter,
+    get_password_hash,
+    hash_executor,
+    ip_limiter,
+    principal_cache,
+)
+from todo_list.settings import get_settings
+
+
+@pytest.fixture(autouse=True)
+def _hash_in_threadpool(monkeypatch):
+    monkeypatch.setattr(hash_executor, 'workers', 0)
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budgets(monkeypatch):
+    # Routes over their `query_budget` raise QueryBudgetExceeded.
+    monkeypatch.setattr(get_settings(), 'QUERY_BUDGET_ENFORCE', True)
+
+
+@pytest.fixture(autouse=True)
+def _clear_principal_cache():
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_login_limiters():
+    yield
+    ip_limiter.clear()
+    email_limiter.clear()
 
 
 @pytest.fixture
 def client(session):
     def get_session_overrride():
-        return session
+        return ThreadedSession(session)
+
+    @asynccontextmanager
+    async def session_factory_override():
+        yield ThreadedSession(session)
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_overrride
+        app.dependency_overrides[get_session_factory] = (
+            lambda: session_factory_override
+        )
         yield client
 
     app.dependency_overrides.clear()
@@ -32,14 +75,51 @@ def session():
         connect_args={'check_same_thread': False},
         poolclass=StaticPool,
     )
+    enable_sqlite_foreign_keys(engine)
     table_registry.metadata.create_all(engine)
 
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
     table_registry.metadata.drop_all(engine)
 
 
+@contextmanager
+def _count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_statements(session):
+    return lambda: _count_statements(session.bind)
+
+
+@pytest.fixture
+def max_queries(session):
+    """`with max_queries(3): ...` fails if the block runs more statements."""
+
+    @contextmanager
+    def assert_max_queries(limit):
+        with _count_statements(session.bind) as statements:
+            yield statements
+
+        assert len(statements) <= limit, (
+            f'{len(statements)} statements over a budget of {limit}:\n'
+            + '\n'.join(statements)
+        )
+
+    return assert_max_queries
+
+
 @contextmanager
 def _mock_db_time(*, model, time=datetime(2024, 12, 11)):
     def fake_time_hook(mapper, connection, target):
@@ -84,3 +164,9 @@ def token(client, user):
     )
 
     return response.json()['access_token']
+
+
+@pytest.fixture
+def internal_headers(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'INTERNAL_TOKEN', 'internal-token')
+    return {'Authorization': 'Bearer internal-token'}
@@ -2,6 +2,9 @@ from http import HTTPStatus
 
 from fastapi.testclient import TestClient
 
+from todo_list.models import TodoState
+from todo_list.responses import FastJSONResponse
+
 
 def test_index(client: TestClient):
     response = client.get('/')
@@ -21,3 +24,10 @@ def test_login(client: TestClient, user):
     assert response.status_code == HTTPStatus.OK
     assert 'access_token' in token
     assert 'token_type' in token
+
+
+def test_fast_json_response_renders_compact_json():
+    response = FastJSONResponse({'state': TodoState.done, 'cursor': None})
+
+    assert response.body == b'{"state":"done","cursor":null}'
+    assert response.headers['content-type'] == 'application/json'
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+from sqlalchemy import create_engine, select
+
+from todo_list.archive import archive_todos
+from todo_list.cli import main
+from todo_list.counters import reconcile_counters
+from todo_list.models import (
+    Todo,
+    TodoArchive,
+    TodoCounter,
+    TodoState,
+    TodoTombstone,
+    User,
+    table_registry,
+)
+from todo_list.settings import get_settings
+
+OLD = datetime(2024, 1, 1)
+
+
+def add_todos(session, user, *states):
+    todos = [
+        Todo(title=state, description='d', state=state, user_id=user.id)
+        for state in states
+    ]
+    session.add_all(todos)
+    session.commit()
+    return todos
+
+
+def test_archive_moves_old_done_and_trashed_todos(session, user, mock_db_time):
+    expected_archived = 2
+    with mock_db_time(model=Todo, time=OLD):
+        done, trash, todo = add_todos(session, user, 'done', 'trash', 'todo')
+    (recent,) = add_todos(session, user, 'done')
+    reconcile_counters(session.connection())
+    session.commit()
+
+    archived = archive_todos(session.bind, timedelta(days=30), size=1)
+
+    assert archived == expected_archived
+    assert list(session.scalars(select(Todo.id).order_by(Todo.id))) == [
+        todo.id,
+        recent.id,
+    ]
+    assert session.execute(
+        select(TodoArchive.id, TodoArchive.state, TodoArchive.updated_at)
+    ).all() == [
+        (done.id, TodoState.done, OLD),
+        (trash.id, TodoState.trash, OLD),
+    ]
+    counts = dict(
+        session.execute(select(TodoCounter.state, TodoCounter.count)).all()
+    )
+    assert counts == {TodoState.done: 1, TodoState.trash: 0, TodoState.todo: 1}
+    assert session.scalar(select(User.version)) == user.version + 2
+    assert session.execute(
+        select(TodoTombstone.todo_id, TodoTombstone.version)
+    ).all() == [(done.id, user.version + 1), (trash.id, user.version + 2)]
+
+
+def test_archived_ids_are_not_reused(session, user, mock_db_time):
+    with mock_db_time(model=Todo, time=OLD):
+        (done,) = add_todos(session, user, 'done')
+
+    assert archive_todos(session.bind, timedelta(days=30), size=10) == 1
+    (todo,) = add_todos(session, user, 'todo')
+
+    assert todo.id > done.id
+
+
+def test_list_todos_include_archived(client, session, user, token):
+    (todo,) = add_todos(session, user, 'todo')
+    session.add(
+        TodoArchive(
+            id=todo.id + 1,
+            title='archived',
+            description='d',
+            state=TodoState.done,
+            user_id=user.id,
+            created_at=OLD,
+            updated_at=OLD,
+        )
+    )
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    hot = client.get('/todos/', headers=headers).json()['todos']
+    first = client.get(
+        '/todos/?include_archived=true&limit=1', headers=headers
+    ).json()
+    second = client.get(
+        '/todos/',
+        params={'include_archived': True, 'cursor': first['next_cursor']},
+        headers=headers,
+    )
+
+    assert [row['id'] for row in hot] == [todo.id]
+    assert [row['id'] for row in first['todos']] == [todo.id]
+    assert second.status_code == HTTPStatus.OK
+    assert second.json()['todos'] == [
+        {
+            'id': todo.id + 1,
+            'title': 'archived',
+            'description': 'd',
+            'state': 'done',
+        }
+    ]
+
+
+def test_cli_archive_todos(monkeypatch, tmp_path, capsys):
+    url = f'sqlite:///{tmp_path / "cli.db"}'
+    monkeypatch.setattr(get_settings(), 'DATABASE_URL', url)
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+    engine.dispose()
+
+    main(['archive-todos', '--older-than-days', '1'])
+
+    assert capsys.readouterr().out == 'Archived 0 todos\n'
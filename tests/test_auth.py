@@ -3,6 +3,9 @@ from http import HTTPStatus
 from fastapi.testclient import TestClient
 from freezegun import freeze_time
 
+from todo_list.security import check_password, get_password_hasher
+from todo_list.settings import get_settings
+
 
 def test_login(client: TestClient, user):
     response = client.post(
@@ -93,3 +96,101 @@ def test_token_expired_dont_refresh(client: TestClient, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not authenticate user'}
+
+
+def test_cached_token_skips_user_lookup(
+    client: TestClient, token, count_statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh-token', headers=headers)
+
+    with count_statements() as statements:
+        response = client.post('/auth/refresh-token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert statements == []
+
+
+def test_updated_user_invalidates_cached_token(
+    client: TestClient, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'email': 'new@email.com',
+            'password': user.clean_pass,
+        },
+    )
+
+    response = client.post('/auth/refresh-token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_login_rate_limited_per_email(
+    client: TestClient, user, count_statements
+):
+    for _ in range(get_settings().LOGIN_EMAIL_BURST):
+        client.post(
+            '/auth/token', data={'username': user.email, 'password': 'wrong'}
+        )
+
+    with count_statements() as statements:
+        response = client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_pass},
+        )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers['Retry-After']) > 0
+    assert statements == []
+
+
+def test_successful_logins_are_not_rate_limited(client: TestClient, user):
+    for _ in range(get_settings().LOGIN_EMAIL_BURST + 1):
+        response = client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_pass},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_login_rate_limited_per_ip(client: TestClient, user):
+    for i in range(get_settings().LOGIN_IP_BURST):
+        client.post(
+            '/auth/token',
+            data={'username': f'{i}@email.com', 'password': 'wrong'},
+        )
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_pass},
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+def test_login_rehashes_password_with_new_costs(
+    session, client: TestClient, user, monkeypatch, count_statements
+):
+    monkeypatch.setattr(get_settings(), 'ARGON2_TIME_COST', 1)
+    monkeypatch.setattr(get_settings(), 'ARGON2_MEMORY_COST', 1024)
+    get_password_hasher.cache_clear()
+    form = {'username': user.email, 'password': user.clean_pass}
+
+    try:
+        response = client.post('/auth/token', data=form)
+        session.refresh(user)
+        with count_statements() as statements:
+            client.post('/auth/token', data=form)
+    finally:
+        get_password_hasher.cache_clear()
+
+    assert response.status_code == HTTPStatus.OK
+    assert user.password.startswith('$argon2id$v=19$m=1024,t=1,p=4$')
+    assert check_password(user.clean_pass, user.password)
+    assert len(statements) == 1
@@ -0,0 +1,109 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from todo_list.broker import (
+    Broker,
+    InMemoryBroker,
+    Subscription,
+    get_broker,
+    register_broker,
+    stream_events,
+)
+
+
+def test_register_broker_rejects_incomplete_brokers(monkeypatch):
+    class PublishOnly(Broker):
+        async def publish(self, user_id, event):
+            pass
+
+    registered = {}
+    monkeypatch.setattr('todo_list.broker.brokers', registered)
+
+    with pytest.raises(TypeError, match='does not implement subscribe'):
+        register_broker('redis', PublishOnly)
+    register_broker('memory', InMemoryBroker)
+
+    assert registered == {'memory': InMemoryBroker}
+
+
+def test_subscription_drops_oldest_events():
+    subscription = Subscription(size=2)
+
+    for id in range(3):
+        subscription.put({'type': 'created', 'id': id})
+
+    assert asyncio.run(subscription.get()) == [
+        {'type': 'created', 'id': 1},
+        {'type': 'created', 'id': 2},
+    ]
+    assert subscription.dropped == 1
+
+
+def test_stream_events_reports_drops_then_events():
+    broker = InMemoryBroker(queue_size=1)
+
+    async def read():
+        events = stream_events(broker, 1, heartbeat=60)
+        chunks = [await events.__anext__()]
+        await broker.publish(1, {'type': 'created', 'id': 1, 'version': 2})
+        await broker.publish(1, {'type': 'deleted', 'id': 1, 'version': 3})
+        await broker.publish(2, {'type': 'created', 'id': 9, 'version': 2})
+        chunks += [await events.__anext__(), await events.__anext__()]
+        await events.aclose()
+        return chunks
+
+    assert asyncio.run(read()) == [
+        ': connected\n\n',
+        'event: dropped\ndata: {"count":1}\n\n',
+        'event: deleted\ndata: {"type":"deleted","id":1,"version":3}\n\n',
+    ]
+    assert not broker.subscribers
+
+
+def test_stream_events_sends_keepalive():
+    async def read():
+        events = stream_events(InMemoryBroker(queue_size=1), 1, heartbeat=0)
+        chunks = [await events.__anext__(), await events.__anext__()]
+        await events.aclose()
+        return chunks
+
+    assert asyncio.run(read()) == [': connected\n\n', ': keepalive\n\n']
+
+
+def test_todo_routes_publish_events(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    subscribe = get_broker().subscribe(user.id)
+
+    with client.portal.wrap_async_context_manager(subscribe) as subscription:
+        todo = client.post(
+            '/todos',
+            headers=headers,
+            json={'title': 'Push', 'description': 'Test', 'state': 'todo'},
+        ).json()
+        client.patch(
+            f'/todos/{todo["id"]}', headers=headers, json={'state': 'done'}
+        )
+        client.post(
+            '/todos/batch',
+            headers=headers,
+            json={'operations': [{'op': 'delete', 'id': todo['id']}]},
+        )
+
+        events = list(subscription.events)
+
+    assert [(event['type'], event['version']) for event in events] == [
+        ('created', 2),
+        ('updated', 3),
+        ('deleted', 4),
+    ]
+    assert events[0]['todo'] == {**todo, 'state': 'todo'}
+    assert events[1]['todo']['state'] == 'done'
+    assert 'todo' not in events[2]
+
+
+def test_stream_requires_token(client):
+    response = client.get('/todos/stream')
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from freezegun import freeze_time
+
+from todo_list.cache import PrincipalCache
+from todo_list.models import User
+
+
+def make_user(id):
+    user = User(username=f'user{id}', password='-', email=f'{id}@email.com')
+    user.id = id
+    user.created_at = user.updated_at = datetime(2024, 12, 11)
+    return user
+
+
+def test_cache_returns_detached_copy():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    user = make_user(1)
+
+    cache.set('token', user, exp=float('inf'))
+    cached = cache.get('token')
+
+    assert cached is not user
+    assert (cached.id, cached.email) == (user.id, user.email)
+
+
+def test_cache_expires_after_ttl():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+
+    with freeze_time('2024-12-11 12:00:00'):
+        cache.set('token', make_user(1), exp=float('inf'))
+
+    with freeze_time('2024-12-11 12:00:59'):
+        assert cache.get('token')
+
+    with freeze_time('2024-12-11 12:01:00'):
+        assert cache.get('token') is None
+        assert len(cache) == 0
+
+
+def test_cache_expiry_is_capped_by_token_exp():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+
+    with freeze_time('2024-12-11 12:00:00') as frozen:
+        cache.set('token', make_user(1), exp=frozen().timestamp() + 5)
+        frozen.tick(5)
+
+        assert cache.get('token') is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.set('a', make_user(1), exp=float('inf'))
+    cache.set('b', make_user(2), exp=float('inf'))
+
+    cache.get('a')
+    cache.set('c', make_user(3), exp=float('inf'))
+
+    assert cache.get('a')
+    assert cache.get('b') is None
+    assert cache.get('c')
+
+
+def test_cache_invalidate_user_drops_every_token():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.set('a', make_user(1), exp=float('inf'))
+    cache.set('b', make_user(1), exp=float('inf'))
+    cache.set('c', make_user(2), exp=float('inf'))
+
+    cache.invalidate_user(1)
+
+    assert cache.get('a') is None
+    assert cache.get('b') is None
+    assert cache.get('c')
+
+
+def test_cache_disabled_with_zero_ttl():
+    cache = PrincipalCache(maxsize=10, ttl=0)
+    cache.set('token', make_user(1), exp=float('inf'))
+
+    assert cache.get('token') is None
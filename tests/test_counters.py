@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, select
+
+from todo_list.cli import main
+from todo_list.counters import reconcile_counters, transitions
+from todo_list.models import Todo, TodoCounter, TodoState, table_registry
+from todo_list.settings import get_settings
+
+
+def test_transitions():
+    before = {1: TodoState.todo, 2: TodoState.todo, 3: TodoState.done}
+    after = {1: TodoState.doing, 2: None, 3: TodoState.done}
+
+    expected_todo_delta = -2
+
+    deltas = transitions(before, after)
+
+    assert deltas[TodoState.todo] == expected_todo_delta
+    assert deltas[TodoState.doing] == 1
+    assert deltas[TodoState.done] == 0
+
+
+def test_reconcile_counters(session, user):
+    session.add_all(
+        Todo(title='t', description='d', state='doing', user_id=user.id)
+        for _ in range(3)
+    )
+    session.add(TodoCounter(user_id=user.id, state=TodoState.trash, count=7))
+    session.commit()
+
+    assert reconcile_counters(session.connection()) == 1
+    session.commit()
+
+    counters = session.execute(
+        select(TodoCounter.state, TodoCounter.count)
+    ).all()
+    assert counters == [(TodoState.doing, 3)]
+
+
+def test_cli_reconcile_counters(monkeypatch, tmp_path, capsys):
+    url = f'sqlite:///{tmp_path / "cli.db"}'
+    monkeypatch.setattr(get_settings(), 'DATABASE_URL', url)
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+    engine.dispose()
+
+    main(['reconcile-counters'])
+
+    assert capsys.readouterr().out == 'Rebuilt 0 todo counters\n'
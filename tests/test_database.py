@@ -0,0 +1,211 @@
+import subprocess
+import sys
+from http import HTTPStatus
+from itertools import count
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from todo_list import database
+from todo_list.app import app
+from todo_list.database import RoutingSession, ThreadedSession
+from todo_list.models import User, table_registry
+from todo_list.settings import get_settings
+
+
+@pytest.fixture
+def async_client(tmp_path, monkeypatch):
+    url = f'sqlite:///{tmp_path / "async.db"}'
+    sync_engine = create_engine(url)
+    table_registry.metadata.create_all(sync_engine)
+
+    monkeypatch.setattr(get_settings(), 'DATABASE_ASYNC', True)
+    async_engine = database.make_engine(url)
+    monkeypatch.setattr(database, 'get_engine', lambda: async_engine)
+
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(async_engine.dispose)
+
+    sync_engine.dispose()
+
+
+def test_threaded_session_runs_sync_session(session, user):
+    threaded = ThreadedSession(session)
+
+    async def load():
+        return await threaded.scalar(select(User).where(User.id == user.id))
+
+    with TestClient(app) as client:
+        loaded = client.portal.call(load)
+
+    assert loaded is user
+    assert threaded.info is session.info
+
+
+def test_async_mode_end_to_end(async_client: TestClient):
+    user = async_client.post(
+        '/users',
+        json={
+            'username': 'async',
+            'email': 'async@email.com',
+            'password': 'async123',
+        },
+    ).json()
+
+    token = async_client.post(
+        '/auth/token',
+        data={'username': 'async@email.com', 'password': 'async123'},
+    ).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    todo = async_client.post(
+        '/todos',
+        headers=headers,
+        json={'title': 'Async', 'description': 'Test', 'state': 'todo'},
+    ).json()
+
+    response = async_client.patch(
+        f'/todos/{todo["id"]}', headers=headers, json={'state': 'done'}
+    )
+    assert response.json()['state'] == 'done'
+
+    todos = async_client.get('/todos', headers=headers).json()['todos']
+    assert todos == [{**todo, 'state': 'done'}]
+
+    exported = async_client.get('/todos/export', headers=headers)
+    assert exported.text.count('\n') == 1
+
+    response = async_client.delete(f'/todos/{todo["id"]}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = async_client.delete(f'/users/{user["id"]}', headers=headers)
+    assert response.json() == {'message': 'User deleted'}
+
+
+def test_sync_mode_yields_threaded_session(monkeypatch):
+    engine = create_engine('sqlite://')
+    monkeypatch.setattr(get_settings(), 'DATABASE_ASYNC', False)
+    monkeypatch.setattr(database, 'get_engine', lambda: engine)
+
+    async def first_session():
+        sessions = database.get_session()
+        session = await sessions.__anext__()
+        await sessions.aclose()
+        return session
+
+    with TestClient(app) as client:
+        session = client.portal.call(first_session)
+
+    assert isinstance(session, ThreadedSession)
+    assert isinstance(session.sync_session, Session)
+
+
+@pytest.fixture
+def replicated(tmp_path, monkeypatch):
+    """A primary and two replicas, each holding one differently named user."""
+    engines = {}
+    for name in ('primary', 'replica0', 'replica1'):
+        engine = create_engine(f'sqlite:///{tmp_path / name}.db')
+        table_registry.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(
+                User(username=name, email=f'{name}@email.com', password='-')
+            )
+            session.commit()
+        engines[name] = engine
+
+    monkeypatch.setattr(database, 'get_engine', lambda: engines['primary'])
+    monkeypatch.setattr(
+        database,
+        'get_replicas',
+        lambda: [engines['replica0'], engines['replica1']],
+    )
+    monkeypatch.setattr(database, 'replica_counter', count())
+
+    yield engines
+
+    for engine in engines.values():
+        engine.dispose()
+
+
+def test_routing_session_reads_replicas_round_robin(replicated):
+    names = []
+    for _ in range(3):
+        with RoutingSession(replicated['primary']) as session:
+            session.info['read_only'] = True
+            names.append(session.scalar(select(User.username)))
+
+    assert names == ['replica0', 'replica1', 'replica0']
+
+
+def test_routing_session_reads_primary_after_write(replicated):
+    with RoutingSession(replicated['primary']) as session:
+        session.info['read_only'] = True
+        assert session.scalar(select(User.username)) == 'replica0'
+
+        session.add(User(username='new', email='new@email.com', password='-'))
+        session.flush()
+
+        usernames = session.scalars(
+            select(User.username).order_by(User.id)
+        ).all()
+        assert usernames == ['primary', 'new']
+
+
+def test_routing_session_without_read_only_uses_primary(replicated):
+    with RoutingSession(replicated['primary']) as session:
+        assert session.scalar(select(User.username)) == 'primary'
+
+
+def test_read_routes_use_replicas(replicated):
+    with TestClient(app) as client:
+        users = client.get('/users/').json()['users']
+        created = client.post(
+            '/users/',
+            json={
+                'username': 'created',
+                'email': 'created@email.com',
+                'password': 'secret',
+            },
+        )
+
+    assert [user['username'] for user in users] == ['replica0']
+    assert created.status_code == HTTPStatus.CREATED
+    with Session(replicated['primary']) as session:
+        assert session.scalar(select(User).where(User.username == 'created'))
+
+
+def test_settings_are_parsed_once():
+    assert get_settings() is get_settings()
+
+
+def test_importing_the_app_builds_no_engine_or_hasher():
+    probe = (
+        'from todo_list import database, security\n'
+        'import todo_list.app\n'
+        'print(database.get_engine.cache_info().currsize,'
+        ' security.get_password_hasher.cache_info().currsize)'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', probe],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.split() == ['0', '0']
+
+
+def test_async_url_swaps_in_async_driver():
+    assert str(database.async_url('sqlite:///db.sqlite')) == (
+        'sqlite+aiosqlite:///db.sqlite'
+    )
+    assert database.async_url('postgresql://db/app').drivername == (
+        'postgresql+asyncpg'
+    )
+    assert database.async_url('sqlite+aiosqlite://').drivername == (
+        'sqlite+aiosqlite'
+    )
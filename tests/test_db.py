@@ -22,6 +22,7 @@ def test_create_user(session, mock_db_time):
         'email': new_user.email,
         'created_at': time,
         'updated_at': time,
+        'version': 1,
         'todos': [],
     }
 
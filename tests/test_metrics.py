@@ -0,0 +1,169 @@
+import logging
+import re
+from collections import Counter
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from todo_list.metrics import (
+    Histogram,
+    QueryBudgetExceeded,
+    RequestStats,
+    check_queries,
+    request_stats,
+)
+from todo_list.models import Todo
+from todo_list.settings import get_settings
+
+
+def test_server_timing_breaks_down_phases(client, token):
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'Test', 'description': 'Test', 'state': 'draft'},
+    )
+
+    timing = response.headers['server-timing']
+    phases = dict(re.findall(r'(\w+);dur=([\d.]+)', timing))
+    assert set(phases) == {'db', 'jwt', 'endpoint', 'serialize', 'total'}
+    assert 'desc="4 queries"' in timing
+
+
+def test_metrics_endpoint_exposes_route_histograms(
+    client, token, internal_headers
+):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    response = client.get('/internal/metrics', headers=internal_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/todos/",status="200"}'
+    ) in response.text
+    assert (
+        'http_request_db_queries_bucket'
+        '{method="GET",route="/todos/",le="+Inf"}'
+    ) in response.text
+
+
+@pytest.mark.parametrize(
+    'headers', [{}, {'Authorization': 'Bearer wrong-token'}]
+)
+def test_metrics_endpoint_rejects_other_callers(
+    client, internal_headers, headers
+):
+    response = client.get('/internal/metrics', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not authenticate'}
+
+
+def test_histogram_render_is_cumulative():
+    histogram = Histogram('latency', 'Latency.', ('route',), (0.1, 1.0))
+
+    histogram.observe(0.05, '/')
+    histogram.observe(0.5, '/')
+    histogram.observe(3, '/')
+
+    assert histogram.render() == [
+        '# HELP latency Latency.',
+        '# TYPE latency histogram',
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 2',
+        'latency_bucket{route="/",le="+Inf"} 3',
+        'latency_sum{route="/"} 3.55',
+        'latency_count{route="/"} 3',
+    ]
+
+
+def test_request_stats_server_timing():
+    stats = RequestStats(queries=2, db=0.0015, phases={'jwt': 0.0002})
+
+    assert (
+        stats.server_timing() == 'db;dur=1.50;desc="2 queries", jwt;dur=0.20'
+    )
+
+
+def test_failed_statements_leave_no_timing_state(session):
+    connection = session.connection()
+    info = dict(connection.info)
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    try:
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM missing'))
+        connection.execute(text('SELECT 1'))
+    finally:
+        request_stats.reset(token)
+
+    assert stats.queries == 1
+    assert connection.info == info
+
+
+def test_query_budget_enforced():
+    stats = RequestStats(queries=3, budget=2)
+
+    with pytest.raises(QueryBudgetExceeded, match='over its budget of 2'):
+        check_queries('GET', '/todos/', stats)
+
+
+def test_query_budget_logged(monkeypatch, caplog):
+    monkeypatch.setattr(get_settings(), 'QUERY_BUDGET_ENFORCE', False)
+    stats = RequestStats(queries=3, budget=2)
+
+    with caplog.at_level(logging.WARNING):
+        check_queries('GET', '/todos/', stats)
+
+    assert 'GET /todos/ ran 3 SQL statements' in caplog.text
+
+
+def test_repeated_statements_logged(monkeypatch, caplog):
+    monkeypatch.setattr(get_settings(), 'QUERY_REPEAT_THRESHOLD', 3)
+    stats = RequestStats(
+        statements=Counter({'SELECT users': 3, 'SELECT todos': 1})
+    )
+
+    with caplog.at_level(logging.WARNING):
+        check_queries('GET', '/todos/', stats)
+
+    assert 'same statement 3 times, possible N+1: SELECT users' in caplog.text
+    assert 'SELECT todos' not in caplog.text
+
+
+def test_repeated_statements_counted_per_request(
+    monkeypatch, caplog, client, token
+):
+    monkeypatch.setattr(get_settings(), 'QUERY_REPEAT_THRESHOLD', 2)
+    todo = {'title': 'Test', 'description': 'Test', 'state': 'draft'}
+
+    with caplog.at_level(logging.WARNING):
+        client.post(
+            '/todos/batch',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'operations': [{'op': 'create', 'todo': todo}] * 2},
+        )
+
+    # SQLite inserts row by row when RETURNING must keep parameter order.
+    assert 'POST /todos/batch ran the same statement 2 times' in caplog.text
+
+
+def test_show_todos_does_not_load_relationships(
+    session, client, user, token, max_queries
+):
+    expected_todos = 5
+    session.add_all(
+        Todo(title=f'{i}', description='-', state='todo', user_id=user.id)
+        for i in range(expected_todos)
+    )
+    session.commit()
+
+    with max_queries(3):
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert len(response.json()['todos']) == expected_todos
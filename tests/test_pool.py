@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from todo_list import database
+from todo_list.pool import (
+    InstrumentedQueuePool,
+    PoolStats,
+    pool_options,
+    pool_status,
+)
+from todo_list.settings import Settings
+
+
+@pytest.fixture
+def pool_engine(tmp_path):
+    settings = Settings(
+        DATABASE_URL=f'sqlite:///{tmp_path / "pool.db"}',
+        DATABASE_POOL_SIZE=1,
+        DATABASE_MAX_OVERFLOW=0,
+        DATABASE_POOL_TIMEOUT=0.01,
+    )
+    engine = create_engine(settings.DATABASE_URL, **pool_options(settings))
+    yield engine
+    engine.dispose()
+
+
+def test_pool_options_skip_sizing_for_in_memory_sqlite():
+    options = pool_options(Settings(DATABASE_URL='sqlite://'))
+
+    assert 'pool_size' not in options
+    assert 'poolclass' not in options
+
+
+def test_pool_stats_count_waits_and_timeouts(pool_engine):
+    assert isinstance(pool_engine.pool, InstrumentedQueuePool)
+
+    with pool_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            pool_engine.connect()
+
+        status = pool_status(pool_engine.pool)
+
+    assert status['size'] == 1
+    assert status['checked_out'] == 1
+    assert status['timeouts'] == 1
+    assert status['wait_count'] == 1
+    assert status['wait_seconds']['+Inf'] == 1
+
+
+def test_pool_stats_histogram_is_cumulative():
+    expected_under_50ms = 2
+    expected_total = 3
+    stats = PoolStats()
+
+    stats.observe(0.0005)
+    stats.observe(0.02)
+    stats.observe(10)
+
+    histogram = stats.histogram()
+    assert histogram['0.001'] == 1
+    assert histogram['0.05'] == expected_under_50ms
+    assert histogram['+Inf'] == expected_total
+
+
+def test_internal_pool_endpoint(
+    client, monkeypatch, pool_engine, internal_headers
+):
+    monkeypatch.setattr(database, 'get_engine', lambda: pool_engine)
+
+    response = client.get('/internal/pool', headers=internal_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['pool'] == 'InstrumentedQueuePool'
+    assert response.json()['checked_out'] == 0
+    assert response.json()['timeouts'] == 0
+
+
+def test_internal_pool_endpoint_rejects_anonymous_callers(
+    client, internal_headers
+):
+    response = client.get('/internal/pool')
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not authenticate'}
+
+
+def test_internal_pool_endpoint_closed_without_a_token(client):
+    response = client.get(
+        '/internal/pool', headers={'Authorization': 'Bearer '}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,65 @@
+import pytest
+
+from todo_list import ratelimit
+from todo_list.ratelimit import TokenBucketLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_limiter_allows_burst_then_refills(clock):
+    limiter = TokenBucketLimiter(burst=2, per_minute=6, maxsize=10)
+
+    assert limiter.hit('key') == 0
+    assert limiter.hit('key') == 0
+    assert limiter.hit('key') == pytest.approx(10)
+
+    clock[0] += 10
+
+    assert limiter.hit('key') == 0
+
+
+def test_limiter_refund_returns_token(clock):
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, maxsize=10)
+
+    limiter.hit('key')
+    limiter.refund('key')
+
+    assert limiter.hit('key') == 0
+
+
+def test_limiter_refund_does_not_exceed_burst(clock):
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, maxsize=10)
+
+    limiter.refund('key')
+    limiter.hit('key')
+    limiter.refund('key')
+    limiter.refund('key')
+    limiter.hit('key')
+
+    assert limiter.hit('key') > 0
+
+
+def test_limiter_evicts_least_recently_used_key(clock):
+    maxsize = 2
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, maxsize=maxsize)
+
+    for key in ('a', 'b', 'a', 'c'):
+        limiter.hit(key)
+
+    assert len(limiter) == maxsize
+    assert limiter.hit('b') == 0
+    assert limiter.hit('c') > 0
+
+
+def test_limiter_disabled_with_zero_size():
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, maxsize=0)
+
+    limiter.hit('key')
+
+    assert limiter.hit('key') == 0
+    assert len(limiter) == 0
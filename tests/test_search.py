@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import select
+
+from todo_list.models import Todo
+from todo_list.search import (
+    LikeSearchBackend,
+    PostgresSearchBackend,
+    SearchBackend,
+    SQLiteSearchBackend,
+    get_backend,
+    register_backend,
+)
+
+
+def test_get_backend_by_dialect():
+    assert isinstance(get_backend('sqlite'), SQLiteSearchBackend)
+    assert isinstance(get_backend('postgresql'), PostgresSearchBackend)
+    assert isinstance(get_backend('mysql'), LikeSearchBackend)
+
+
+def test_register_backend(monkeypatch):
+    backend = LikeSearchBackend()
+    monkeypatch.setattr('todo_list.search.backends', {})
+
+    register_backend('sqlite', backend)
+
+    assert get_backend('sqlite') is backend
+
+
+def test_register_backend_rejects_incomplete_backends(monkeypatch):
+    class NoSearch(SearchBackend):
+        ddl = ('CREATE TABLE todos_fts (id)',)
+
+    monkeypatch.setattr('todo_list.search.backends', {})
+
+    with pytest.raises(TypeError):
+        register_backend('sqlite', NoSearch())
+    with pytest.raises(TypeError):
+        register_backend('sqlite', object())
+
+
+def test_match_expression_quotes_every_word():
+    expression = SQLiteSearchBackend.match_expression(' say "hi" OR * ')
+
+    assert expression == '"say" """hi""" "OR" "*"'
+
+
+def test_like_backend_searches_title_and_description(session, user):
+    session.add_all([
+        Todo(title='milk', description='-', state='todo', user_id=user.id),
+        Todo(title='-', description='milk', state='todo', user_id=user.id),
+        Todo(title='-', description='-', state='todo', user_id=user.id),
+    ])
+    session.commit()
+
+    query = LikeSearchBackend.search(select(Todo), 'milk')
+
+    assert [todo.id for todo in session.scalars(query)] == [1, 2]
@@ -1,15 +1,93 @@
+import asyncio
+import os
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
 from jwt import decode
 
-from todo_list.security import create_access_token, settings
+from todo_list.hashing import HashingExecutor, calibrate_argon2
+from todo_list.security import (
+    check_password,
+    create_access_token,
+    get_password_hash,
+    hash_passwords,
+)
+from todo_list.settings import get_settings
 
 
 def test_jwt():
     data = {'test': 'test'}
     token = create_access_token(data)
 
+    settings = get_settings()
     decoded = decode(
         token, settings.SECRET_KEY, algorithms=[settings.ALGORIHTM]
     )
 
     assert decoded['test'] == data['test']
     assert decoded['exp']
+
+
+def test_hashing_executor_runs_in_process_pool():
+    executor = HashingExecutor(workers=1, queue_depth=1)
+
+    async def round_trip():
+        hashed = await executor.run(get_password_hash, 'secret')
+        return await executor.run(check_password, 'secret', hashed)
+
+    try:
+        assert asyncio.run(round_trip())
+    finally:
+        executor.shutdown()
+
+    assert executor.pending == 0
+
+
+def test_hashing_executor_rejects_when_queue_is_full():
+    executor = HashingExecutor(workers=0, queue_depth=1)
+    executor.pending = 1
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(executor.run(get_password_hash, 'secret'))
+
+    assert error.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert error.value.headers == {'Retry-After': '1'}
+
+
+def test_hashing_executor_replaces_a_broken_pool():
+    executor = HashingExecutor(workers=1, queue_depth=1)
+
+    async def crash_then_hash():
+        with pytest.raises(HTTPException) as error:
+            await executor.run(os._exit, 1)
+        hashed = await executor.run(get_password_hash, 'secret')
+        return error.value, hashed
+
+    try:
+        error, hashed = asyncio.run(crash_then_hash())
+    finally:
+        executor.shutdown()
+
+    assert error.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert check_password('secret', hashed)
+
+
+def test_hash_passwords_keeps_order(monkeypatch):
+    monkeypatch.setattr('todo_list.security.HASH_BATCH_SIZE', 2)
+    executor = HashingExecutor(workers=0, queue_depth=1)
+    passwords = ['a', 'b', 'c', 'd', 'e']
+
+    hashed = asyncio.run(hash_passwords(passwords, executor))
+
+    assert [check_password(*pair) for pair in zip(passwords, hashed)] == [
+        True
+    ] * len(passwords)
+
+
+def test_calibrate_argon2_spends_time_after_memory():
+    def measure(time_cost, memory_cost, parallelism):
+        return time_cost * memory_cost / 65536 * 0.1
+
+    assert calibrate_argon2(0.25, 65536, 4, measure) == (2, 65536, 0.2)
+    assert calibrate_argon2(0.03, 65536, 4, measure) == (1, 16384, 0.025)
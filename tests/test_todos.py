@@ -1,8 +1,13 @@
+import csv
+import io
+import json
 from http import HTTPStatus
 
 import factory.fuzzy
+import pytest
+from sqlalchemy import select
 
-from todo_list.models import Todo, TodoState
+from todo_list.models import Todo, TodoState, User
 
 
 class TodoFactory(factory.Factory):
@@ -30,6 +35,28 @@ def test_create_todo(client, token):
     }
 
 
+def test_create_todo_inserts_with_returning(client, token, count_statements):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh-token', headers=headers)
+
+    with count_statements() as statements:
+        client.post(
+            '/todos',
+            headers=headers,
+            json={'title': 'Test', 'description': 'Test', 'state': 'draft'},
+        )
+
+    version, todos, counters = statements
+    assert todos.startswith('INSERT INTO todos')
+    assert 'RETURNING' in todos
+    assert counters.startswith('INSERT INTO todo_counters')
+    assert 'ON CONFLICT' in counters
+    assert version.startswith('UPDATE users SET')
+    assert 'version' in version
+    assert 'CURRENT_TIMESTAMP' not in version
+    assert 'RETURNING' in version
+
+
 def test_show_todos(session, client, user, token):
     expected_todos = 5
     session.bulk_save_objects(
@@ -56,6 +83,60 @@ def test_show_todos_with_pagination(session, client, user, token):
     assert len(todos) == expected_todos
 
 
+def test_show_todos_with_cursor(session, client, user, token):
+    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    ids, cursor = [], None
+    while True:
+        url = '/todos?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url, headers=headers).json()
+        ids += [todo['id'] for todo in page['todos']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_show_todos_with_cursor_and_filter(session, client, user, token):
+    session.bulk_save_objects(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+        + TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+        + TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+    )
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos?state=done&limit=4', headers=headers).json()
+    second = client.get(
+        f'/todos?state=done&limit=4&cursor={first["next_cursor"]}',
+        headers=headers,
+    ).json()
+
+    assert [todo['id'] for todo in first['todos']] == [1, 2, 3, 7]
+    assert [todo['id'] for todo in second['todos']] == [8, 9]
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not-a-cursor',
+        'eyJpZCI6dHJ1ZX0',  # {"id":true}
+    ],
+)
+def test_show_todos_invalid_cursor(client, token, cursor):
+    response = client.get(
+        f'/todos?cursor={cursor}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
 def test_show_todos_filter_by_title(session, client, user, token):
     expected_todos = 5
     session.bulk_save_objects(
@@ -136,6 +217,274 @@ def test_show_todos_with_combined_filters(session, client, user, token):
     assert len(todos) == expected_todos
 
 
+def test_search_todos_ranks_matches(session, client, user, token):
+    session.add_all([
+        Todo(
+            title='Buy bread',
+            description='on the way home',
+            state=TodoState.todo,
+            user_id=user.id,
+        ),
+        Todo(
+            title='Bake bread',
+            description='bread with olive oil, the good bread',
+            state=TodoState.todo,
+            user_id=user.id,
+        ),
+        Todo(
+            title='Pay bills',
+            description='water and power',
+            state=TodoState.todo,
+            user_id=user.id,
+        ),
+    ])
+    session.commit()
+
+    response = client.get(
+        '/todos/search?q=bread',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'Bake bread',
+        'Buy bread',
+    ]
+
+
+def test_search_todos_follows_writes(session, client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = client.post(
+        '/todos',
+        headers=headers,
+        json={'title': 'Café', 'description': 'Test', 'state': 'draft'},
+    ).json()
+
+    found = client.get('/todos/search?q=cafe', headers=headers).json()
+    assert [t['id'] for t in found['todos']] == [todo['id']]
+
+    client.patch(
+        f'/todos/{todo["id"]}', headers=headers, json={'title': 'Tea'}
+    )
+    assert client.get('/todos/search?q=cafe', headers=headers).json() == {
+        'todos': [],
+        'next_cursor': None,
+    }
+
+    client.delete(f'/todos/{todo["id"]}', headers=headers)
+    assert client.get('/todos/search?q=tea', headers=headers).json() == {
+        'todos': [],
+        'next_cursor': None,
+    }
+
+
+def test_search_todos_only_returns_own_todos(session, client, user, token):
+    other = User(username='other', email='other@email.com', password='-')
+    session.add(other)
+    session.flush()
+    session.bulk_save_objects(
+        TodoFactory.create_batch(3, user_id=other.id, title='secret plan')
+    )
+    session.commit()
+
+    response = client.get(
+        '/todos/search?q=secret',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['todos'] == []
+
+
+def test_search_todos_quotes_query_syntax(client, token):
+    response = client.get(
+        '/todos/search?q="unbalanced AND (',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize('limit', [-1, 0, 1001])
+def test_search_todos_rejects_out_of_range_limit(client, token, limit):
+    response = client.get(
+        '/todos/search',
+        params={'q': 'test', 'limit': limit},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_batch_todos(session, client, user, token, count_statements):
+    session.bulk_save_objects(TodoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh-token', headers=headers)
+
+    with count_statements() as statements:
+        response = client.post(
+            '/todos/batch',
+            headers=headers,
+            json={
+                'operations': [
+                    {
+                        'op': 'create',
+                        'todo': {
+                            'title': 'New 1',
+                            'description': 'Test',
+                            'state': 'draft',
+                        },
+                    },
+                    {'op': 'update', 'id': 1, 'todo': {'state': 'done'}},
+                    {'op': 'delete', 'id': 2},
+                    {
+                        'op': 'create',
+                        'todo': {
+                            'title': 'New 2',
+                            'description': 'Test',
+                            'state': 'todo',
+                        },
+                    },
+                    {'op': 'update', 'id': 1, 'todo': {'title': 'Updated'}},
+                ]
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [
+            {'op': 'create', 'id': 4, 'status': HTTPStatus.CREATED},
+            {'op': 'update', 'id': 1, 'status': HTTPStatus.OK},
+            {'op': 'delete', 'id': 2, 'status': HTTPStatus.OK},
+            {'op': 'create', 'id': 5, 'status': HTTPStatus.CREATED},
+            {'op': 'update', 'id': 1, 'status': HTTPStatus.OK},
+        ]
+    }
+    # The todos, then users.version.
+    expected_updates = 2
+    verbs = [statement.split()[0] for statement in statements]
+    assert verbs.count('SELECT') == 1
+    assert verbs.count('UPDATE') == expected_updates
+    assert verbs.count('DELETE') == 1
+
+    session.expire_all()
+    todos = {todo.id: todo for todo in session.scalars(select(Todo))}
+    assert sorted(todos) == [1, 3, 4, 5]
+    assert (todos[1].title, todos[1].state) == ('Updated', TodoState.done)
+    assert todos[5].title == 'New 2'
+
+
+def test_batch_todos_reports_missing_todos(session, client, user, token):
+    other = User(username='other', email='other@email.com', password='-')
+    session.add(other)
+    session.flush()
+    session.add(TodoFactory(user_id=other.id))
+    session.add(TodoFactory(user_id=user.id))
+    session.commit()
+
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'operations': [
+                {'op': 'update', 'id': 1, 'todo': {'state': 'done'}},
+                {'op': 'delete', 'id': 2},
+                {'op': 'update', 'id': 2, 'todo': {'state': 'done'}},
+                {'op': 'delete', 'id': 2},
+            ]
+        },
+    )
+
+    assert [r['status'] for r in response.json()['results']] == [
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.NOT_FOUND,
+    ]
+    session.expire_all()
+    assert session.get(Todo, 2) is None
+
+
+def test_batch_todos_rejects_null_updates(session, client, user, token):
+    todo = TodoFactory(user_id=user.id, title='Keep', state=TodoState.todo)
+    session.add(todo)
+    session.commit()
+
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'operations': [
+                {'op': 'update', 'id': todo.id, 'todo': {'state': None}},
+                {'op': 'update', 'id': todo.id, 'todo': {'title': 'New'}},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in response.json()['results']] == [
+        HTTPStatus.UNPROCESSABLE_ENTITY,
+        HTTPStatus.OK,
+    ]
+    session.refresh(todo)
+    assert (todo.title, todo.state) == ('New', TodoState.todo)
+
+
+def test_batch_todos_rejects_unknown_operation(client, token):
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'operations': [{'op': 'upsert', 'id': 1}]},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_export_todos_ndjson(session, client, user, token):
+    session.bulk_save_objects(TodoFactory.create_batch(3, user_id=user.id))
+    session.add(TodoFactory(user_id=user.id, title='a "quoted", title'))
+    session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['id'] for line in lines] == [1, 2, 3, 4]
+    assert lines[3]['title'] == 'a "quoted", title'
+    assert set(lines[0]) == {'id', 'title', 'description', 'state'}
+
+
+def test_export_todos_csv(session, client, user, token, monkeypatch):
+    expected_rows = 6  # the header and five todos
+    monkeypatch.setattr('todo_list.export.CHUNK_SIZE', 2)
+    session.bulk_save_objects(TodoFactory.create_batch(4, user_id=user.id))
+    session.add(
+        TodoFactory(user_id=user.id, title='a, b', state=TodoState.doing)
+    )
+    session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'todos.csv' in response.headers['content-disposition']
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ['id', 'title', 'description', 'state']
+    assert len(rows) == expected_rows
+    assert rows[5][1:] == ['a, b', rows[5][2], 'doing']
+
+
+def test_export_todos_requires_authentication(client):
+    response = client.get('/todos/export')
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
 def test_update_todo(session, user, token, client):
     todo = TodoFactory(user_id=user.id)
 
@@ -186,3 +535,215 @@ def test_delete_todo_not_found_error(session, user, token, client):
 
     assert todo.status_code == HTTPStatus.NOT_FOUND
     assert todo.json() == {'detail': 'Task not found'}
+
+
+def test_show_todos_etag_not_modified(
+    session, client, user, token, count_statements
+):
+    session.bulk_save_objects(TodoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/todos/', headers=headers)
+    etag = response.headers['etag']
+
+    with count_statements() as statements:
+        response = client.get(
+            '/todos/', headers=headers | {'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+    assert not any('FROM todos' in statement for statement in statements)
+
+
+def test_show_todos_etag_depends_on_query(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/?state=done', headers=headers)
+    second = client.get('/todos/?state=draft', headers=headers)
+
+    assert first.headers['etag'] != second.headers['etag']
+
+
+def test_todo_writes_change_etag(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    todo = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'Test', 'description': 'Test', 'state': 'draft'},
+    ).json()
+    response = client.get('/todos/', headers=headers | {'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers['etag']
+
+    client.patch(
+        f'/todos/{todo["id"]}', headers=headers, json={'state': 'done'}
+    )
+    response = client.get('/todos/', headers=headers | {'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers['etag']
+
+    client.delete(f'/todos/{todo["id"]}', headers=headers)
+    response = client.get('/todos/', headers=headers | {'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['todos'] == []
+
+
+def test_todo_stats_follow_writes(client, token):
+    expected_drafts = 2
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def stats():
+        return client.get('/todos/stats', headers=headers).json()
+
+    todo = {'title': 'Test', 'description': 'Test', 'state': 'draft'}
+    first = client.post('/todos/', headers=headers, json=todo).json()
+    client.post('/todos/', headers=headers, json=todo)
+    assert stats()['counts']['draft'] == expected_drafts
+    assert stats()['total'] == expected_drafts
+
+    client.patch(
+        f'/todos/{first["id"]}', headers=headers, json={'state': 'done'}
+    )
+    assert stats()['counts'] == {
+        'draft': 1,
+        'todo': 0,
+        'doing': 0,
+        'done': 1,
+        'trash': 0,
+    }
+
+    client.delete(f'/todos/{first["id"]}', headers=headers)
+    assert stats()['counts']['done'] == 0
+    assert stats()['total'] == 1
+
+
+def test_todo_stats_follow_batch(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Test', 'description': 'Test', 'state': 'todo'}
+    ids = [
+        client.post('/todos/', headers=headers, json=todo).json()['id']
+        for _ in range(3)
+    ]
+
+    client.post(
+        '/todos/batch',
+        headers=headers,
+        json={
+            'operations': [
+                {'op': 'create', 'todo': todo | {'state': 'doing'}},
+                {'op': 'update', 'id': ids[0], 'todo': {'state': 'done'}},
+                {'op': 'update', 'id': ids[1], 'todo': {'state': 'done'}},
+                {'op': 'delete', 'id': ids[1]},
+                {'op': 'delete', 'id': ids[2]},
+            ]
+        },
+    )
+
+    response = client.get('/todos/stats', headers=headers).json()
+    assert response['counts'] == {
+        'draft': 0,
+        'todo': 0,
+        'doing': 1,
+        'done': 1,
+        'trash': 0,
+    }
+
+
+def test_todo_changes_since_token(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Sync', 'description': 'Test', 'state': 'todo'}
+    first = client.post('/todos', headers=headers, json=todo).json()
+    second = client.post('/todos', headers=headers, json=todo).json()
+
+    full = client.get('/todos/changes', headers=headers).json()
+    assert full['todos'] == [first, second]
+    assert full['deleted'] == []
+
+    unchanged = client.get(
+        '/todos/changes', params={'since': full['token']}, headers=headers
+    ).json()
+    assert unchanged == {
+        'todos': [],
+        'deleted': [],
+        'token': full['token'],
+        'next_cursor': None,
+    }
+
+    client.patch(
+        f'/todos/{first["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.delete(f'/todos/{second["id"]}', headers=headers)
+    third = client.post('/todos', headers=headers, json=todo).json()
+
+    delta = client.get(
+        '/todos/changes', params={'since': full['token']}, headers=headers
+    ).json()
+    assert delta['todos'] == [{**first, 'state': 'done'}, third]
+    assert delta['deleted'] == [second['id']]
+    assert delta['token'] != full['token']
+
+
+def test_todo_changes_full_sync_is_paged(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Sync', 'description': 'Test', 'state': 'todo'}
+    first, second = (
+        client.post('/todos', headers=headers, json=todo).json()
+        for _ in range(2)
+    )
+
+    page = client.get(
+        '/todos/changes', params={'limit': 1}, headers=headers
+    ).json()
+    client.patch(
+        f'/todos/{first["id"]}', headers=headers, json={'state': 'done'}
+    )
+    last = client.get(
+        '/todos/changes',
+        params={'limit': 1, 'cursor': page['next_cursor']},
+        headers=headers,
+    ).json()
+    delta = client.get(
+        '/todos/changes', params={'since': last['token']}, headers=headers
+    ).json()
+
+    assert page['todos'] == [first]
+    assert last['todos'] == [second]
+    assert last['next_cursor'] is None
+    # The token is the version the sync started at, so the write made
+    # between the pages is picked up by the next sync.
+    assert last['token'] == page['token']
+    assert delta['todos'] == [{**first, 'state': 'done'}]
+
+
+@pytest.mark.parametrize('limit', [-1, 0, 1001])
+def test_todo_changes_rejects_out_of_range_limit(client, token, limit):
+    response = client.get(
+        '/todos/changes',
+        params={'limit': limit},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    ('params', 'detail'),
+    [
+        ({'since': 'not-a-token'}, 'Invalid sync token'),
+        ({'cursor': 'not-a-cursor'}, 'Invalid cursor'),
+    ],
+)
+def test_todo_changes_invalid_token(client, token, params, detail):
+    response = client.get(
+        '/todos/changes',
+        params=params,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': detail}
@@ -1,8 +1,22 @@
+import json
+from datetime import datetime
 from http import HTTPStatus
 
+import pytest
 from fastapi.testclient import TestClient
-
+from sqlalchemy import select
+
+from todo_list.cli import main
+from todo_list.models import (
+    Todo,
+    TodoArchive,
+    TodoCounter,
+    TodoState,
+    TodoTombstone,
+    User,
+)
 from todo_list.schemas import UserResponse
+from todo_list.settings import get_settings
 
 
 def test_create_user(client: TestClient):
@@ -23,17 +37,69 @@ def test_create_user(client: TestClient):
     }
 
 
+def test_create_user_inserts_with_returning(
+    client: TestClient, count_statements
+):
+    with count_statements() as statements:
+        response = client.post(
+            '/users',
+            json={
+                'username': 'test_user',
+                'email': 'test_user@email.com',
+                'password': '1234',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert [s.split()[0] for s in statements] == ['SELECT', 'INSERT']
+    assert 'RETURNING' in statements[1]
+
+
+def test_create_user_without_returning(
+    client: TestClient, session, monkeypatch
+):
+    monkeypatch.setattr(session.bind.dialect, 'insert_returning', False)
+
+    response = client.post(
+        '/users',
+        json={
+            'username': 'test_user',
+            'email': 'test_user@email.com',
+            'password': '1234',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['id'] == 1
+    assert session.get(User, 1).created_at
+
+
 def test_users(client: TestClient):
     response = client.get('/users')
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
 
 
 def test_users_with_users(client: TestClient, user):
     user_schema = UserResponse.model_validate(user).model_dump()
     response = client.get('/users')
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_users_with_cursor(client: TestClient, session, user):
+    session.add_all([
+        User(username=f'user{i}', email=f'user{i}@email.com', password='-')
+        for i in range(2)
+    ])
+    session.commit()
+
+    first = client.get('/users?limit=2').json()
+    second = client.get(f'/users?limit=2&cursor={first["next_cursor"]}')
+
+    assert [u['id'] for u in first['users']] == [1, 2]
+    assert [u['id'] for u in second.json()['users']] == [3]
+    assert second.json()['next_cursor'] is None
 
 
 def test_user(client: TestClient, user):
@@ -158,6 +224,40 @@ def test_delete_user(client: TestClient, user, token):
     assert response.json() == {'message': 'User deleted'}
 
 
+def test_delete_user_cascades_in_the_database(
+    session, client, user, token, count_statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    for title in ('Keep', 'Delete'):
+        todo = client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': title, 'description': 'Test', 'state': 'done'},
+        ).json()
+    client.delete(f'/todos/{todo["id"]}', headers=headers)
+    session.add(
+        TodoArchive(
+            id=100,
+            title='Archived',
+            description='Test',
+            state=TodoState.done,
+            user_id=user.id,
+            created_at=datetime(2024, 1, 1),
+            updated_at=datetime(2024, 1, 1),
+        )
+    )
+    session.commit()
+
+    with count_statements() as statements:
+        client.delete(f'/users/{user.id}', headers=headers)
+
+    assert [s for s in statements if s.startswith('DELETE')] == [
+        'DELETE FROM users WHERE users.id = ?'
+    ]
+    for model in (Todo, TodoCounter, TodoArchive, TodoTombstone):
+        assert session.scalars(select(model)).all() == []
+
+
 def test_delete_user_not_enough_permisson_error(
     client: TestClient, user, token
 ):
@@ -167,3 +267,147 @@ def test_delete_user_not_enough_permisson_error(
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permissions'}
+
+
+def test_read_user_etag(client, user, token):
+    response = client.get(f'/users/{user.id}')
+    etag = response.headers['etag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': user.clean_pass,
+        },
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'renamed'
+    assert response.headers['etag'] != etag
+
+
+def test_import_users_ndjson(session, client, user, token, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'ADMIN_EMAILS', [user.email])
+    monkeypatch.setattr('todo_list.user_import.CHUNK_SIZE', 2)
+    lines = [
+        {'username': 'new1', 'email': 'new1@email.com', 'password': 'pw'},
+        {'username': user.username, 'email': 'x@email.com', 'password': 'pw'},
+        'not json',
+        {'username': 'new2', 'email': user.email, 'password': 'pw'},
+        {'username': 'new1', 'email': 'other@email.com', 'password': 'pw'},
+        {'username': 'new3', 'email': 'invalid', 'password': 'pw'},
+        {'username': 'new4', 'email': 'new4@email.com', 'password': 'pw'},
+    ]
+    body = '\n'.join(
+        line if isinstance(line, str) else json.dumps(line) for line in lines
+    )
+
+    response = client.post(
+        '/users/import',
+        headers={'Authorization': f'Bearer {token}'},
+        content=body,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    results = [json.loads(line) for line in response.text.splitlines()]
+    new = dict(session.execute(select(User.username, User.id)).all())
+    assert results[0] == {'line': 1, 'id': new['new1']}
+    assert results[1] == {'line': 2, 'error': 'Username already exists'}
+    assert results[2] == {'line': 3, 'error': 'Invalid JSON'}
+    assert results[3] == {'line': 4, 'error': 'Email already exists'}
+    assert results[4] == {'line': 5, 'error': 'Username already exists'}
+    assert results[5]['error'].startswith('email: value is not a valid')
+    assert results[6] == {'line': 7, 'id': new['new4']}
+    assert set(new) == {user.username, 'new1', 'new4'}
+
+
+def test_import_users_retries_a_raced_chunk_row_by_row(
+    session, client, user, token, monkeypatch
+):
+    async def nothing_taken(session, users):
+        return set(), set()
+
+    # Another writer creates `user` after the duplicate check.
+    monkeypatch.setattr('todo_list.user_import.find_taken', nothing_taken)
+    monkeypatch.setattr(get_settings(), 'ADMIN_EMAILS', [user.email])
+    lines = [
+        {'username': 'new1', 'email': 'new1@email.com', 'password': 'pw'},
+        {'username': user.username, 'email': 'x@email.com', 'password': 'pw'},
+        {'username': 'new2', 'email': 'new2@email.com', 'password': 'pw'},
+    ]
+
+    response = client.post(
+        '/users/import',
+        headers={'Authorization': f'Bearer {token}'},
+        content='\n'.join(json.dumps(line) for line in lines),
+    )
+
+    new = dict(session.execute(select(User.username, User.id)).all())
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'line': 1, 'id': new['new1']},
+        {'line': 2, 'error': 'Username or Email already exists'},
+        {'line': 3, 'id': new['new2']},
+    ]
+
+
+def test_import_users_csv_can_log_in(client, user, token, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'ADMIN_EMAILS', [user.email])
+    body = (
+        'username,email,password\r\n'
+        'new,new@email.com,"a, secret"\r\n'
+        'new,new@email.com,"a, secret"\r\n'
+    )
+
+    response = client.post(
+        '/users/import?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+        content=body,
+    )
+
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'line': 2, 'id': user.id + 1},
+        {'line': 3, 'error': 'Username already exists'},
+    ]
+    response = client.post(
+        '/auth/token',
+        data={'username': 'new@email.com', 'password': 'a, secret'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_import_users_rejects_non_utf8_body(client, user, token, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'ADMIN_EMAILS', [user.email])
+
+    response = client.post(
+        '/users/import?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+        # 'José' in Latin-1.
+        content=b'username,email,password\r\nJos\xe9,j@email.com,pw\r\n',
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Request body must be UTF-8 text'}
+
+
+def test_import_users_requires_admin(client, token):
+    response = client.post(
+        '/users/import',
+        headers={'Authorization': f'Bearer {token}'},
+        content='{}',
+    )
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    assert response.json() == {'detail': 'Not enough permissions'}
+
+
+def test_cli_import_users_rejects_zero_workers(capsys):
+    with pytest.raises(SystemExit):
+        main(['import-users', 'users.csv', '--workers', '0'])
+
+    assert 'must be at least 1, got 0' in capsys.readouterr().err
@@ -1,17 +1,31 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI
 
-from todo_list.routers import auth, todos, users
+from todo_list.metrics import MetricsMiddleware, TimedRoute
+from todo_list.responses import FastJSONResponse
+from todo_list.routers import auth, internal, todos, users
 from todo_list.schemas import Message
+from todo_list.security import hash_executor
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    hash_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.router.route_class = TimedRoute
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(todos.router)
+app.include_router(internal.router)
 
 
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
-def index():
+async def index():
     return {'message': 'Hello, World!'}
@@ -0,0 +1,119 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import (
+    Connection,
+    Engine,
+    bindparam,
+    delete,
+    insert,
+    select,
+    update,
+)
+
+from todo_list.models import (
+    Todo,
+    TodoArchive,
+    TodoCounter,
+    TodoState,
+    TodoTombstone,
+    User,
+)
+
+ARCHIVED_STATES = (TodoState.done, TodoState.trash)
+COLUMNS = (
+    Todo.id,
+    Todo.title,
+    Todo.description,
+    Todo.state,
+    Todo.user_id,
+    Todo.created_at,
+    Todo.updated_at,
+)
+
+
+def archive_batch(connection: Connection, cutoff: datetime, size: int) -> int:
+    """Move up to `size` todos last updated before `cutoff` to the archive.
+
+    Counters, user versions and tombstones are written in the same
+    transaction, so the stats, the ETags and `GET /todos/changes` never
+    disagree with the hot table.
+    """
+    rows = connection.execute(
+        select(Todo.id, Todo.user_id, Todo.state)
+        .where(
+            Todo.state.in_(ARCHIVED_STATES),
+            Todo.updated_at < cutoff,
+        )
+        .order_by(Todo.id)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+
+    ids = [row.id for row in rows]
+    connection.execute(
+        insert(TodoArchive).from_select(
+            [column.key for column in COLUMNS],
+            select(*COLUMNS).where(Todo.id.in_(ids)),
+        )
+    )
+    connection.execute(delete(Todo).where(Todo.id.in_(ids)))
+
+    deltas = Counter((row.user_id, row.state) for row in rows)
+    connection.execute(
+        update(TodoCounter)
+        .where(
+            TodoCounter.user_id == bindparam('b_user_id'),
+            TodoCounter.state == bindparam('b_state'),
+        )
+        .values(count=TodoCounter.count - bindparam('b_count')),
+        [
+            {'b_user_id': user_id, 'b_state': state, 'b_count': count}
+            for (user_id, state), count in deltas.items()
+        ],
+    )
+    users = {row.user_id for row in rows}
+    bump = (
+        update(User)
+        .where(User.id.in_(users))
+        .values(version=User.version + 1, updated_at=User.updated_at)
+    )
+    if connection.dialect.update_returning:
+        versions = dict(
+            connection.execute(bump.returning(User.id, User.version)).all()
+        )
+    else:
+        connection.execute(bump)
+        versions = dict(
+            connection.execute(
+                select(User.id, User.version).where(User.id.in_(users))
+            ).all()
+        )
+    connection.execute(
+        insert(TodoTombstone),
+        [
+            {
+                'todo_id': row.id,
+                'user_id': row.user_id,
+                'version': versions[row.user_id],
+            }
+            for row in rows
+        ],
+    )
+
+    return len(rows)
+
+
+def archive_todos(engine: Engine, older_than: timedelta, size: int) -> int:
+    """Archive every eligible todo, one short transaction per batch."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - older_than
+    total = 0
+
+    while True:
+        with engine.begin() as connection:
+            archived = archive_batch(connection, cutoff, size)
+        total += archived
+        if archived < size:
+            return total
@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from functools import cache
+
+from pydantic_core import to_json
+
+from todo_list.settings import get_settings
+
+
+class Subscription:
+    """Events waiting for one subscriber, at most `size` of them.
+
+    A subscriber that falls behind loses its oldest events instead of
+    holding up the publisher; `dropped` counts them so the client knows
+    to catch up through `GET /todos/changes`.
+    """
+
+    def __init__(self, size: int):
+        self.events = deque(maxlen=size)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def put(self, event: dict) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        self.ready.set()
+
+    async def get(self) -> list[dict]:
+        await self.ready.wait()
+        self.ready.clear()
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+
+class Broker(ABC):
+    """Publishes todo events to the streams of the todos' owner.
+
+    `publish` is called by the todo routes after they commit and
+    `subscribe` by `GET /todos/stream`. Backends shared by several
+    processes implement both and are added with `register_broker`.
+    """
+
+    @abstractmethod
+    async def publish(self, user_id: int, event: dict) -> None: ...
+
+    async def publish_many(self, user_id: int, events: list[dict]) -> None:
+        for event in events:
+            await self.publish(user_id, event)
+
+    @abstractmethod
+    def subscribe(
+        self, user_id: int
+    ) -> AbstractAsyncContextManager[Subscription]: ...
+
+
+class InMemoryBroker(Broker):
+    """Delivers to subscribers of this process only."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+    async def publish(self, user_id, event):
+        for subscription in self.subscribers.get(user_id, ()):
+            subscription.put(event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        subscription = Subscription(self.queue_size)
+        self.subscribers[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self.subscribers[user_id].discard(subscription)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+
+brokers = {'memory': InMemoryBroker}
+
+
+def register_broker(name: str, factory: type[Broker]) -> None:
+    """Make `factory` available as `BROKER=name`.
+
+    It is called with `STREAM_QUEUE_SIZE` on first use; checking it here
+    makes an incomplete backend fail at startup instead.
+    """
+    if not (isinstance(factory, type) and issubclass(factory, Broker)):
+        raise TypeError(f'{factory!r} is not a Broker subclass')
+    if inspect.isabstract(factory):
+        missing = ', '.join(sorted(factory.__abstractmethods__))
+        raise TypeError(f'{factory.__name__} does not implement {missing}')
+    brokers[name] = factory
+
+
+@cache
+def get_broker() -> Broker:
+    settings = get_settings()
+    return brokers[settings.BROKER](settings.STREAM_QUEUE_SIZE)
+
+
+def todo_event(type: str, version: int, id: int, todo=None) -> dict:
+    """Event for a write to todo `id` at the owner's `version`.
+
+    Creates and single updates carry the todo; batch updates and
+    deletes only its id.
+    """
+    event = {'type': type, 'id': id, 'version': version}
+    if todo is not None:
+        event['todo'] = {
+            'id': todo.id,
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state,
+        }
+    return event
+
+
+def format_event(type: str, data) -> str:
+    return f'event: {type}\ndata: {to_json(data).decode()}\n\n'
+
+
+async def stream_events(broker: Broker, user_id: int, heartbeat: float):
+    """Server-sent events for `user_id`, until the client disconnects.
+
+    A comment goes out right away and after every `heartbeat` seconds of
+    silence, so proxies flush the headers and dead connections are
+    noticed.
+    """
+    async with broker.subscribe(user_id) as subscription:
+        yield ': connected\n\n'
+
+        while True:
+            try:
+                events = await asyncio.wait_for(subscription.get(), heartbeat)
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            if subscription.dropped:
+                yield format_event('dropped', {'count': subscription.dropped})
+                subscription.dropped = 0
+
+            for event in events:
+                yield format_event(event['type'], event)
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from time import time
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from todo_list.models import User
+
+
+class PrincipalCache:
+    """Bounded LRU of authenticated users keyed by their bearer token.
+
+    Entries hold a detached copy of the `User` row and expire after `ttl`
+    seconds or at the token's own `exp`, whichever comes first.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+        self._tokens: dict[int, set[str]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str) -> User | None:
+        entry = self._entries.get(token)
+        if not entry:
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time():
+            self._discard(token)
+            return None
+
+        self._entries.move_to_end(token)
+        return user
+
+    def set(self, token: str, user: User, exp: float) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+
+        self._discard(token)
+        self._entries[token] = (min(time() + self.ttl, exp), snapshot(user))
+        self._tokens.setdefault(user.id, set()).add(token)
+
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        for token in self._tokens.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens.clear()
+
+    def _discard(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if not entry:
+            return
+
+        tokens = self._tokens.get(entry[1].id, set())
+        tokens.discard(token)
+        if not tokens:
+            self._tokens.pop(entry[1].id, None)
+
+
+def snapshot(user: User) -> User:
+    """Detached copy of `user` that `Session.merge(load=False)` accepts."""
+    copy = User(
+        username=user.username, password=user.password, email=user.email
+    )
+    copy.id = user.id
+    copy.created_at = user.created_at
+    copy.updated_at = user.updated_at
+    copy.version = user.version
+    make_transient_to_detached(copy)
+    return copy
@@ -0,0 +1,148 @@
+"""Maintenance commands.
+
+python -m todo_list.cli reconcile-counters
+python -m todo_list.cli archive-todos --older-than-days 30
+python -m todo_list.cli import-users users.csv --workers 8
+python -m todo_list.cli calibrate-argon2 --target-ms 250
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from todo_list.archive import archive_todos
+from todo_list.counters import reconcile_counters
+from todo_list.database import ThreadedSession, make_sync_engine
+from todo_list.hashing import HashingExecutor, calibrate_argon2
+from todo_list.settings import get_settings
+from todo_list.user_import import import_users, parse_users
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {value}')
+    return number
+
+
+def reconcile(args):
+    engine = make_sync_engine()
+    with engine.begin() as connection:
+        rows = reconcile_counters(connection)
+    engine.dispose()
+    print(f'Rebuilt {rows} todo counters')
+
+
+def archive(args):
+    engine = make_sync_engine()
+    rows = archive_todos(
+        engine, timedelta(days=args.older_than_days), args.batch_size
+    )
+    engine.dispose()
+    print(f'Archived {rows} todos')
+
+
+async def run_import(engine, records, executor) -> tuple[int, int]:
+    @asynccontextmanager
+    async def session_factory():
+        with Session(engine) as session:
+            yield ThreadedSession(session)
+
+    created = failed = 0
+    async for results in import_users(session_factory, records, executor):
+        for result in results:
+            if 'error' in result:
+                failed += 1
+                print(json.dumps(result))
+            else:
+                created += 1
+    return created, failed
+
+
+def import_file(args):
+    path = Path(args.path)
+    format = args.format or ('csv' if path.suffix == '.csv' else 'ndjson')
+    records = parse_users(path.read_text(encoding='utf-8-sig'), format)
+
+    engine = make_sync_engine()
+    executor = HashingExecutor(workers=args.workers, queue_depth=0)
+    try:
+        created, failed = asyncio.run(run_import(engine, records, executor))
+    finally:
+        executor.shutdown()
+        engine.dispose()
+    print(f'Imported {created} users, skipped {failed}')
+
+
+def calibrate(args):
+    time_cost, memory_cost, elapsed = calibrate_argon2(
+        args.target_ms / 1000, args.memory_cost, args.parallelism
+    )
+    print(f'ARGON2_TIME_COST={time_cost}')
+    print(f'ARGON2_MEMORY_COST={memory_cost}')
+    print(f'ARGON2_PARALLELISM={args.parallelism}')
+    print(f'# a verify takes {elapsed * 1000:.0f} ms on this machine')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    command = commands.add_parser(
+        'reconcile-counters', help='rebuild todo_counters from todos'
+    )
+    command.set_defaults(handler=reconcile)
+
+    settings = get_settings()
+    command = commands.add_parser(
+        'archive-todos', help='move old done and trashed todos to the archive'
+    )
+    command.add_argument(
+        '--older-than-days', type=int, default=settings.ARCHIVE_AFTER_DAYS
+    )
+    command.add_argument(
+        '--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE
+    )
+    command.set_defaults(handler=archive)
+
+    command = commands.add_parser(
+        'import-users', help='create users from an NDJSON or CSV file'
+    )
+    command.add_argument('path')
+    command.add_argument('--format', choices=['ndjson', 'csv'])
+    command.add_argument(
+        '--workers',
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help='hashing processes',
+    )
+    command.set_defaults(handler=import_file)
+
+    command = commands.add_parser(
+        'calibrate-argon2',
+        help='pick Argon2 costs for a target verify time on this machine',
+    )
+    command.add_argument('--target-ms', type=float, default=250)
+    command.add_argument(
+        '--memory-cost',
+        type=int,
+        default=settings.ARGON2_MEMORY_COST,
+        help='KiB to start from; lowered only if one pass is too slow',
+    )
+    command.add_argument(
+        '--parallelism', type=int, default=settings.ARGON2_PARALLELISM
+    )
+    command.set_defaults(handler=calibrate)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
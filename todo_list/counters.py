@@ -0,0 +1,92 @@
+from collections import Counter
+
+from sqlalchemy import Connection, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_list.models import Todo, TodoCounter, TodoState
+
+upserts = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+async def adjust_counters(
+    session: AsyncSession, user_id: int, deltas: Counter[TodoState]
+) -> None:
+    """Add `deltas` to `user_id`'s counters in the caller's transaction."""
+    rows = [
+        {'user_id': user_id, 'state': state, 'count': delta}
+        for state, delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    upsert = upserts.get(session.get_bind().dialect.name)
+    if upsert:
+        statement = upsert(TodoCounter)
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[TodoCounter.user_id, TodoCounter.state],
+                set_={'count': TodoCounter.count + statement.excluded.count},
+            ),
+            rows,
+        )
+        return
+
+    for row in rows:
+        result = await session.execute(
+            update(TodoCounter)
+            .where(
+                TodoCounter.user_id == user_id,
+                TodoCounter.state == row['state'],
+            )
+            .values(count=TodoCounter.count + row['count'])
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            await session.execute(insert(TodoCounter), [row])
+
+
+def transitions(
+    before: dict[int, TodoState], after: dict[int, TodoState | None]
+) -> Counter[TodoState]:
+    """Counter deltas for todos moving from `before` to `after`.
+
+    A `None` state in `after` means the todo was deleted.
+    """
+    deltas = Counter()
+    for id, state in after.items():
+        deltas[before[id]] -= 1
+        if state is not None:
+            deltas[state] += 1
+    return deltas
+
+
+async def get_counters(
+    session: AsyncSession, user_id: int
+) -> dict[TodoState, int]:
+    counts = dict.fromkeys(TodoState, 0)
+    counts.update(
+        (
+            await session.execute(
+                select(TodoCounter.state, TodoCounter.count).where(
+                    TodoCounter.user_id == user_id
+                )
+            )
+        ).all()
+    )
+    return counts
+
+
+def reconcile_counters(connection: Connection) -> int:
+    """Rebuild every counter from `todos` with one grouped scan."""
+    connection.execute(delete(TodoCounter))
+    result = connection.execute(
+        insert(TodoCounter).from_select(
+            ['user_id', 'state', 'count'],
+            select(Todo.user_id, Todo.state, func.count()).group_by(
+                Todo.user_id, Todo.state
+            ),
+        )
+    )
+    return result.rowcount
@@ -1,11 +1,269 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from functools import cache
+from itertools import count
+
+from anyio import CapacityLimiter
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import (
+    URL,
+    Engine,
+    Select,
+    create_engine,
+    event,
+    insert,
+    make_url,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from todo_list.pool import pool_options
+from todo_list.settings import get_settings
+
+# Drivers `DATABASE_ASYNC` swaps in. URLs in the settings name the sync
+# driver, so migrations and the CLI can use them as they are.
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+
+def async_url(url: str | URL) -> URL:
+    url = make_url(url)
+    if url.get_dialect().is_async:
+        return url
+
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver known for {backend!r} databases')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def make_engine(url: str):
+    settings = get_settings()
+    if settings.DATABASE_ASYNC:
+        url = async_url(url)
+        engine = create_async_engine(url, **pool_options(settings, url))
+    else:
+        engine = create_engine(url, **pool_options(settings, url))
+    enable_sqlite_foreign_keys(engine)
+    return engine
+
+
+def make_sync_engine(**kwargs) -> Engine:
+    """Blocking engine on `DATABASE_URL`, for migrations and the CLI."""
+    engine = create_engine(get_settings().DATABASE_URL, **kwargs)
+    enable_sqlite_foreign_keys(engine)
+    return engine
+
+
+def enable_sqlite_foreign_keys(engine) -> None:
+    """Turn on foreign keys, which SQLite ignores by default.
+
+    Deleting a user relies on their `ON DELETE CASCADE` to remove the
+    user's todos, counters, archive and tombstones.
+    """
+    engine = getattr(engine, 'sync_engine', engine)
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _sqlite_foreign_keys_on)
+
+
+def _sqlite_foreign_keys_on(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys = ON')
+    cursor.close()
+
+
+@cache
+def get_engine():
+    """The primary engine, created on first use rather than at import."""
+    return make_engine(get_settings().DATABASE_URL)
+
+
+@cache
+def get_replicas() -> list:
+    return [make_engine(url) for url in get_settings().DATABASE_REPLICA_URLS]
+
+
+replica_counter = count()
+
+# Size of the threadpool FastAPI runs blocking code in.
+THREADPOOL_SIZE = 40
+
+
+class RoutingSession(Session):
+    """Sends reads to a replica while `info['read_only']` is set.
+
+    The replica is picked round-robin once per session. The first flush
+    or non-SELECT statement clears the flag, so everything after a write
+    reads from the primary and sees it.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get('read_only') and get_replicas():
+            if self._flushing or (
+                clause is not None and not isinstance(clause, Select)
+            ):
+                self.info['read_only'] = False
+            elif clause is not None:
+                return self.info.setdefault('replica', next_replica())
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def next_replica() -> Engine:
+    replicas = get_replicas()
+    replica = replicas[next(replica_counter) % len(replicas)]
+    return getattr(replica, 'sync_engine', replica)
+
+
+class ThreadedSession:
+    """Blocking `Session` behind the awaitable API of `AsyncSession`.
+
+    Routes are written once against `AsyncSession`; in sync mode every
+    statement runs in the threadpool, as the routes themselves used to.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def __getattr__(self, name):
+        return getattr(self.sync_session, name)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, *args, **kwargs
+        )
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, *args, **kwargs
+        )
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def merge(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.merge, *args, **kwargs
+        )
+
+    async def refresh(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.refresh, *args, **kwargs
+        )
+
+    async def delete(self, instance):
+        return await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.flush, *args, **kwargs
+        )
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement.execution_options(stream_results=True),
+            *args,
+            **kwargs,
+        )
+        return ThreadedResult(result)
+
+    async def commit(self):
+        return await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        return await run_in_threadpool(self.sync_session.rollback)
+
+
+class ThreadedResult:
+    """Server-side cursor read in threadpool batches, like `AsyncResult`."""
+
+    def __init__(self, result):
+        self.sync_result = result
+
+    async def partitions(self, size: int):
+        try:
+            while True:
+                rows = await run_in_threadpool(
+                    self.sync_result.fetchmany, size
+                )
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self.sync_result.close()
+
+
+@cache
+def session_limiter(engine: Engine) -> CapacityLimiter:
+    """Bound open sync sessions to the connections `engine` can hand out.
+
+    A `ThreadedSession` keeps its connection between statements while it
+    waits for a thread. With more sessions than connections, every thread
+    can end up blocked on the pool while the sessions holding connections
+    wait for a thread.
+    """
+    pool = engine.pool
+    if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+        return CapacityLimiter(pool.size() + pool._max_overflow)
+
+    return CapacityLimiter(THREADPOOL_SIZE)
+
+
+async def get_session():
+    engine = get_engine()
+    if get_settings().DATABASE_ASYNC:
+        async with AsyncSession(
+            engine, sync_session_class=RoutingSession, expire_on_commit=False
+        ) as session:
+            yield session
+    else:
+        async with session_limiter(engine):
+            with RoutingSession(engine, expire_on_commit=False) as session:
+                yield ThreadedSession(session)
+
+
+async def get_read_session(session: AsyncSession = Depends(get_session)):
+    """The request's session, reading from a replica until it writes.
+
+    Dependencies are cached per request, so `get_current_user` and the
+    route share this session and its choice of replica.
+    """
+    session.info['read_only'] = True
+    return session
+
+
+def get_session_factory():
+    """Sessions for work that outlives the request, like streamed bodies.
+
+    Dependencies with `yield` are closed before a `StreamingResponse`
+    starts sending, so a generator cannot use the request's session.
+    """
+    return asynccontextmanager(get_session)
+
 
-from todo_list.settings import Settings
+async def insert_returning(session: AsyncSession, model, **values):
+    """INSERT one `model` row and load it, defaults included, in one go.
 
-engine = create_engine(Settings().DATABASE_URL)
+    Dialects without `INSERT ... RETURNING` fall back to a flush followed
+    by a refresh.
+    """
+    if session.get_bind().dialect.insert_returning:
+        return await session.scalar(
+            insert(model).values(**values).returning(model)
+        )
 
+    instance = model(**values)
+    session.add(instance)
+    await session.flush()
+    await session.refresh(instance)
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+    return instance
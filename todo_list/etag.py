@@ -0,0 +1,61 @@
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from todo_list.models import User
+
+
+def make_etag(request: Request, user_id: int, version: int) -> str:
+    """Strong ETag for `request` as seen by `user_id` at `version`.
+
+    The query string is part of the tag, so each filter or page of a
+    collection validates independently.
+    """
+    params = sorted(request.query_params.multi_items())
+    key = f'{request.url.path}|{user_id}|{version}|{params}'
+    return '"{}"'.format(blake2b(key.encode(), digest_size=16).hexdigest())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+    tags = (tag.strip().removeprefix('W/') for tag in header.split(','))
+    return etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag}
+    )
+
+
+async def get_version(session: AsyncSession, user_id: int) -> int:
+    return await session.scalar(select(User.version).where(User.id == user_id))
+
+
+async def bump_version(session: AsyncSession, user_id: int) -> int:
+    """Invalidate the ETags of `user_id`; commits with the caller's write.
+
+    Returns the new version, which todo writes stamp on the rows they
+    touch so `GET /todos/changes` can find them.
+    """
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        # Keep `onupdate` from touching updated_at on todo writes.
+        .values(version=User.version + 1, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if session.get_bind().dialect.update_returning:
+        return await session.scalar(statement.returning(User.version))
+
+    await session.execute(statement)
+    return await get_version(session, user_id)
@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from todo_list.models import Todo
+
+CHUNK_SIZE = 1000
+COLUMNS = (Todo.id, Todo.title, Todo.description, Todo.state)
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def to_ndjson(rows) -> str:
+    return ''.join(
+        json.dumps({**row._asdict(), 'state': row.state.value}) + '\n'
+        for row in rows
+    )
+
+
+def to_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (row.id, row.title, row.description, row.state.value) for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def export_todos(session_factory, user_id: int, format: str):
+    """Stream a user's todos in `format`, one chunk of rows at a time."""
+    query = (
+        select(*COLUMNS)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    encode = to_csv if format == 'csv' else to_ndjson
+
+    if format == 'csv':
+        yield ','.join(column.key for column in COLUMNS) + '\r\n'
+
+    async with session_factory() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions(CHUNK_SIZE):
+            yield encode(rows)
@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+# Argon2 needs at least 8 KiB of memory per lane.
+MIN_MEMORY_COST = 8
+
+
+def unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        detail='Too many password operations, try again later',
+        headers={'Retry-After': '1'},
+    )
+
+
+class HashingExecutor:
+    """Runs password hashing off the event loop with bounded backlog.
+
+    Work goes to a pool of `workers` processes, so Argon2 neither blocks
+    the loop nor holds the GIL of the serving process. At most `workers`
+    jobs run and `queue_depth` more wait; past that callers get a 503
+    right away instead of queueing behind a login storm. With no workers
+    the job runs in the threadpool. A pool broken by a dying worker is
+    replaced on the next call.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self._pool = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if not self._pool:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._pool
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_depth:
+            raise unavailable()
+
+        self.pending += 1
+        try:
+            if not self.workers:
+                return await run_in_threadpool(fn, *args)
+
+            pool = self.pool
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # Jobs in flight all see the same broken pool; only the first
+            # drops it, so a pool built since is left alone.
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise unavailable() from None
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._pool:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def measure_verify(
+    time_cost: int, memory_cost: int, parallelism: int, samples: int = 3
+) -> float:
+    """Median seconds one Argon2 verify with these costs takes here."""
+    hasher = Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    hashed = hasher.hash('calibration')
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify('calibration', hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_argon2(
+    target: float, memory_cost: int, parallelism: int, measure=measure_verify
+) -> tuple[int, int, float]:
+    """The slowest costs whose verify stays within `target` seconds.
+
+    Keeps `memory_cost` unless a single pass is already too slow, halving
+    it until one fits, then adds passes while they fit: memory first, as
+    RFC 9106 advises. Returns the time cost, the memory cost and the
+    verify time measured for them.
+    """
+    elapsed = measure(1, memory_cost, parallelism)
+    while (
+        elapsed > target and memory_cost // 2 >= MIN_MEMORY_COST * parallelism
+    ):
+        memory_cost //= 2
+        elapsed = measure(1, memory_cost, parallelism)
+
+    time_cost = 1
+    while (
+        slower := measure(time_cost + 1, memory_cost, parallelism)
+    ) <= target:
+        time_cost, elapsed = time_cost + 1, slower
+
+    return time_cost, memory_cost, elapsed
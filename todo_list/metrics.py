@@ -0,0 +1,310 @@
+import inspect
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from fastapi import Depends
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+
+from todo_list.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)  # fmt: skip
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+@dataclass
+class RequestStats:
+    """What one request spent its time on, in seconds."""
+
+    start: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    endpoint_end: float | None = None
+    budget: int | None = None
+    statements: Counter[str] | None = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        entries = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"'
+        ]
+        entries.extend(
+            f'{phase};dur={seconds * 1000:.2f}'
+            for phase, seconds in self.phases.items()
+        )
+        return ', '.join(entries)
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    'request_stats', default=None
+)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to `phase` of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = request_stats.get()
+        if stats:
+            stats.add(phase, time.perf_counter() - start)
+
+
+# The start time lives on the execution context, which is discarded
+# with the statement, so one that raises leaves nothing behind.
+@event.listens_for(Engine, 'before_cursor_execute', named=True)
+def start_query(context, **kw):
+    if request_stats.get():
+        context.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute', named=True)
+def end_query(context, statement, **kw):
+    stats = request_stats.get()
+    start = getattr(context, 'query_start', None)
+    if stats and start is not None:
+        stats.queries += 1
+        stats.db += time.perf_counter() - start
+        if stats.statements is not None:
+            stats.statements[statement] += 1
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit: int):
+    """Route dependency declaring how many SQL statements a request may run.
+
+    Requests over budget are logged, or fail with `QueryBudgetExceeded`
+    when `QUERY_BUDGET_ENFORCE` is set, as it is in the tests.
+    """
+
+    def declare_budget():
+        stats = request_stats.get()
+        if stats:
+            stats.budget = limit
+
+    return Depends(declare_budget)
+
+
+def check_queries(method: str, route: str, stats: RequestStats) -> None:
+    settings = get_settings()
+    for statement, count in (stats.statements or {}).items():
+        if count >= settings.QUERY_REPEAT_THRESHOLD:
+            logger.warning(
+                '%s %s ran the same statement %d times, possible N+1: %s',
+                method,
+                route,
+                count,
+                statement,
+            )
+
+    if stats.budget is not None and stats.queries > stats.budget:
+        message = (
+            f'{method} {route} ran {stats.queries} SQL statements, '
+            f'over its budget of {stats.budget}'
+        )
+        if settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def endpoint_done() -> None:
+    stats = request_stats.get()
+    if stats:
+        stats.endpoint_end = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """Splits handler time into the endpoint and the response rendering.
+
+    Everything the handler does after the endpoint returns, validating
+    and serializing through `response_model`, counts as `serialize`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+
+        if inspect.iscoroutinefunction(call):
+
+            @wraps(call)
+            async def endpoint(*args, **kwargs):
+                with timed('endpoint'):
+                    result = await call(*args, **kwargs)
+                endpoint_done()
+                return result
+
+        else:
+
+            @wraps(call)
+            def endpoint(*args, **kwargs):
+                with timed('endpoint'):
+                    result = call(*args, **kwargs)
+                endpoint_done()
+                return result
+
+        self.dependant.call = endpoint
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = request_stats.get()
+            if stats and stats.endpoint_end:
+                stats.add(
+                    'serialize', time.perf_counter() - stats.endpoint_end
+                )
+            return response
+
+        return timed_handler
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Histogram:
+    """Prometheus histogram; a `+Inf` bucket follows `buckets`."""
+
+    def __init__(self, name: str, help: str, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = (*buckets, float('inf'))
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        counts, total = self.series.setdefault(
+            labels, [[0] * len(self.buckets), 0.0]
+        )
+        self.series[labels][1] = total + value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for labels, (counts, total) in sorted(self.series.items()):
+            pairs = [
+                f'{name}="{escape(str(value))}"'
+                for name, value in zip(self.labels, labels)
+            ]
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else str(bound)
+                series = ','.join([*pairs, f'le="{le}"'])
+                lines.append(f'{self.name}_bucket{{{series}}} {cumulative}')
+            series = ','.join(pairs)
+            lines.append(f'{self.name}_sum{{{series}}} {total}')
+            lines.append(f'{self.name}_count{{{series}}} {cumulative}')
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds',
+    'Time to complete a request.',
+    ('method', 'route', 'status'),
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    'http_request_db_queries',
+    'SQL statements executed per request.',
+    ('method', 'route'),
+    QUERY_BUCKETS,
+)
+request_db_duration = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing SQL per request.',
+    ('method', 'route'),
+    LATENCY_BUCKETS,
+)
+request_phase_duration = Histogram(
+    'http_request_phase_duration_seconds',
+    'Time spent per request phase (jwt, endpoint, serialize).',
+    ('method', 'route', 'phase'),
+    LATENCY_BUCKETS,
+)
+histograms = (
+    request_duration,
+    request_queries,
+    request_db_duration,
+    request_phase_duration,
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+def record(method: str, route: str, status: int, stats: RequestStats):
+    request_duration.observe(
+        time.perf_counter() - stats.start, method, route, status
+    )
+    request_queries.observe(stats.queries, method, route)
+    request_db_duration.observe(stats.db, method, route)
+    for phase, seconds in stats.phases.items():
+        if phase != 'total':
+            request_phase_duration.observe(seconds, method, route, phase)
+
+
+class MetricsMiddleware:
+    """Per-request stats, sent as `Server-Timing` and kept as histograms."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        if get_settings().QUERY_REPEAT_THRESHOLD:
+            stats.statements = Counter()
+        token = request_stats.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                stats.phases['total'] = time.perf_counter() - stats.start
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            record(scope['method'], route, status, stats)
+
+        check_queries(scope['method'], route, stats)
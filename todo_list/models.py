@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
@@ -29,21 +29,105 @@ class User:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+    # Bumped by every write to the user or their todos; feeds the ETags.
+    version: Mapped[int] = mapped_column(
+        init=False, default=1, server_default='1'
+    )
 
+    # Deleting a user leaves their rows to the ON DELETE CASCADE foreign
+    # keys instead of loading and deleting every todo.
     todos: Mapped[list['Todo']] = relationship(
-        init=False, back_populates='user', cascade='all, delete-orphan'
+        init=False,
+        back_populates='user',
+        cascade='all, delete-orphan',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_version', 'user_id', 'version'),
+        # Without AUTOINCREMENT SQLite hands out a deleted todo's id again,
+        # which would clash with the archive and the tombstones.
+        {'sqlite_autoincrement': True},
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
     state: Mapped[TodoState]
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
+    # The owner's version at the last write, for `GET /todos/changes`.
+    version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
 
     user: Mapped[User] = relationship(init=False, back_populates='todos')
+
+
+@table_registry.mapped_as_dataclass
+class TodoArchive:
+    """Done and trashed todos moved out of `todos` by the archiver."""
+
+    __tablename__ = 'todos_archive'
+    __table_args__ = (Index('ix_todos_archive_user_id_id', 'user_id', 'id'),)
+
+    # Keeps the id the todo had in `todos`.
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    title: Mapped[str]
+    description: Mapped[str]
+    state: Mapped[TodoState]
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    created_at: Mapped[datetime]
+    updated_at: Mapped[datetime]
+    archived_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    """Number of `user_id`'s todos in `state`, kept by the todo routes."""
+
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """A deleted or archived todo, reported by `GET /todos/changes`."""
+
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index('ix_todo_tombstones_user_id_version', 'user_id', 'version'),
+    )
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    todo_id: Mapped[int]
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    version: Mapped[int]
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
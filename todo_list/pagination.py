@@ -0,0 +1,78 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from todo_list.schemas import FilterPage
+
+
+def encode_token(**fields: int) -> str:
+    payload = json.dumps(fields, separators=(',', ':'))
+    return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(
+    token: str, fields: tuple[str, ...], detail: str
+) -> tuple[int, ...]:
+    """The integer `fields` of an `encode_token` token, or a 400."""
+    try:
+        payload = json.loads(
+            urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        )
+        values = tuple(payload[field] for field in fields)
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        values = (None,)
+
+    # bool is an int subclass, but `{"id": true}` is not a cursor.
+    if not all(
+        isinstance(value, int) and not isinstance(value, bool)
+        for value in values
+    ):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    return values
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_token(id=last_id)
+
+
+def decode_cursor(cursor: str) -> int:
+    (last_id,) = decode_token(cursor, ('id',), 'Invalid cursor')
+    return last_id
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    key: InstrumentedAttribute,
+    page: FilterPage,
+):
+    """Return one page of `query` ordered by `key` and the next cursor.
+
+    `query` selects columns, not entities; the page comes back as dicts
+    ready to be encoded.
+
+    With a cursor the page starts right after the last key seen, so it
+    costs the same however deep it is; without one `offset` is used.
+    """
+    query = query.order_by(key)
+
+    if page.cursor:
+        query = query.where(key > decode_cursor(page.cursor))
+    else:
+        query = query.offset(page.offset)
+
+    rows = (await session.execute(query.limit(page.limit + 1))).all()
+    items = rows[: page.limit]
+    next_cursor = None
+
+    if len(rows) > page.limit and items:
+        next_cursor = encode_cursor(getattr(items[-1], key.key))
+
+    return [row._asdict() for row in items], next_cursor
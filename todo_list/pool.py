@@ -0,0 +1,125 @@
+import threading
+import time
+
+from sqlalchemy import exc, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from todo_list.settings import Settings
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+
+class PoolStats:
+    """Checkout wait times and timeouts of one pool.
+
+    Checkouts happen on threadpool threads in sync mode, so updates take
+    a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = [0] * len(WAIT_BUCKETS)
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float) -> None:
+        with self.lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def timeout(self) -> None:
+        with self.lock:
+            self.timeouts += 1
+
+    def histogram(self) -> dict[str, int]:
+        """Cumulative counts per bucket, Prometheus style."""
+        with self.lock:
+            counts, total = {}, 0
+            for bound, count in zip(WAIT_BUCKETS, self.buckets):
+                total += count
+                counts['+Inf' if bound == float('inf') else str(bound)] = total
+            return counts
+
+
+class InstrumentedPool:
+    """Mixin timing how long `QueuePool` makes each checkout wait."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeout()
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return record
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(settings: Settings, url: str | None = None) -> dict:
+    """`create_engine` pool arguments for `url`, the primary by default.
+
+    Sizing only applies to dialects that pool with a `QueuePool` by
+    default; SQLite in memory and aiosqlite keep their own pools.
+    """
+    options = {
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+    }
+
+    url = make_url(url or settings.DATABASE_URL)
+    default = url.get_dialect().get_pool_class(url)
+    if not issubclass(default, QueuePool):
+        return options
+
+    if issubclass(default, AsyncAdaptedQueuePool):
+        options['poolclass'] = InstrumentedAsyncQueuePool
+    else:
+        options['poolclass'] = InstrumentedQueuePool
+
+    return options | {
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+    }
+
+
+def pool_status(pool: Pool) -> dict:
+    status = {'pool': type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status |= {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+        }
+
+    if isinstance(pool, InstrumentedPool):
+        stats = pool.stats
+        status |= {
+            'timeouts': stats.timeouts,
+            'wait_count': stats.wait_count,
+            'wait_seconds_sum': stats.wait_sum,
+            'wait_seconds': stats.histogram(),
+        }
+
+    return status
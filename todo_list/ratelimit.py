@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from time import monotonic
+
+
+class TokenBucketLimiter:
+    """Token bucket per key, for at most `maxsize` keys.
+
+    Each key starts with `burst` tokens and earns `per_minute` more every
+    minute, up to `burst`. The least recently used key is evicted past
+    `maxsize`, which forgets its bucket; size it above the number of
+    keys expected within a refill period.
+    """
+
+    def __init__(self, burst: int, per_minute: float, maxsize: int):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.burst > 0
+
+    def hit(self, key: str) -> float:
+        """Take a token for `key`.
+
+        Returns 0 when one was available, otherwise the seconds until the
+        next one is; nothing is taken then.
+        """
+        if not self.enabled:
+            return 0
+
+        now = monotonic()
+        tokens = self._tokens(key, now)
+        retry_after = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate if self.rate else 60
+
+        self._store(key, tokens, now)
+        return retry_after
+
+    def refund(self, key: str) -> None:
+        """Give back the token a `hit` took."""
+        if self.enabled and key in self._buckets:
+            now = monotonic()
+            self._store(key, min(self.burst, self._tokens(key, now) + 1), now)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def _store(self, key: str, tokens: float, now: float) -> None:
+        self._buckets.pop(key, None)
+        self._buckets[key] = (tokens, now)
+
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
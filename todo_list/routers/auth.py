@@ -1,50 +1,81 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from todo_list.database import get_session
+from todo_list.database import get_session, get_session_factory
+from todo_list.metrics import TimedRoute, query_budget
 from todo_list.models import User
 from todo_list.schemas import (
     Token,
 )
 from todo_list.security import (
-    check_password,
+    check_login_rate,
     create_access_token,
     get_current_user,
+    login_succeeded,
+    save_rehashed_password,
+    verify_and_update_password,
 )
 
-router = APIRouter(prefix='/auth', tags=['auth'])
+router = APIRouter(prefix='/auth', tags=['auth'], route_class=TimedRoute)
 
 
-@router.post('/token', response_model=Token)
-def login(
+@router.post('/token', response_model=Token, dependencies=[query_budget(2)])
+async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
+    session_factory=Depends(get_session_factory),
 ):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+    ip = request.client.host if request.client else ''
+    check_login_rate(form_data.username, ip)
 
-    if not user:
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST,
-            detail='Incorrect email or password',
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
+
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password(
+            form_data.password, user.password
         )
 
-    if not check_password(form_data.password, user.password):
+    if not valid:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password',
         )
 
+    if new_hash:
+        # Hashed with other Argon2 costs; store the new hash after replying.
+        background_tasks.add_task(
+            save_rehashed_password,
+            session_factory,
+            user.id,
+            user.password,
+            new_hash,
+        )
+
+    login_succeeded(form_data.username, ip)
     access_token = create_access_token(data={'sub': user.email})
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
 
-@router.post('/refresh-token', response_model=Token)
-def refresh_token(user: User = Depends(get_current_user)):
+@router.post(
+    '/refresh-token', response_model=Token, dependencies=[query_budget(1)]
+)
+async def refresh_token(user: User = Depends(get_current_user)):
     new_token = create_access_token(data={'sub': user.email})
 
     return {'access_token': new_token, 'token_type': 'bearer'}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Response
+
+from todo_list import database
+from todo_list.metrics import TimedRoute, render_metrics
+from todo_list.pool import pool_status
+from todo_list.schemas import PoolStatus
+from todo_list.security import check_internal_token
+
+# Operational endpoints, left out of the OpenAPI schema and only served
+# to callers holding INTERNAL_TOKEN, such as the metrics scraper.
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    include_in_schema=False,
+    dependencies=[Depends(check_internal_token)],
+    route_class=TimedRoute,
+)
+
+
+@router.get(
+    '/pool', response_model=PoolStatus, response_model_exclude_none=True
+)
+async def pool():
+    return pool_status(database.get_engine().pool)
+
+
+@router.get('/metrics', response_class=Response)
+async def metrics():
+    return Response(render_metrics(), media_type='text/plain; version=0.0.4')
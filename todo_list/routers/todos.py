@@ -1,79 +1,370 @@
+from collections import Counter
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from todo_list.database import get_session
-from todo_list.models import Todo, User
+from todo_list.broker import get_broker, stream_events, todo_event
+from todo_list.counters import adjust_counters, get_counters, transitions
+from todo_list.database import (
+    get_read_session,
+    get_session,
+    get_session_factory,
+    insert_returning,
+)
+from todo_list.etag import (
+    bump_version,
+    etag_matches,
+    get_version,
+    make_etag,
+    not_modified,
+)
+from todo_list.export import COLUMNS, MEDIA_TYPES, export_todos
+from todo_list.metrics import TimedRoute, query_budget
+from todo_list.models import Todo, TodoArchive, TodoTombstone, User
+from todo_list.pagination import decode_token, encode_token, paginate
+from todo_list.responses import FastJSONResponse
 from todo_list.schemas import (
+    FilterChanges,
+    FilterSearch,
     FilterTodo,
     Message,
+    TodoBatch,
+    TodoBatchResponse,
+    TodoChanges,
     TodoList,
     TodoResponse,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
+from todo_list.search import get_backend
 from todo_list.security import get_current_user
+from todo_list.settings import get_settings
 
-router = APIRouter(prefix='/todos', tags=['todos'])
+router = APIRouter(prefix='/todos', tags=['todos'], route_class=TimedRoute)
 
+EVENTS = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
 
-@router.post('/', response_model=TodoResponse)
-def create_todo(
+
+@router.post('/', response_model=TodoResponse, dependencies=[query_budget(4)])
+async def create_todo(
     todo: TodoSchema,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    todo_db = Todo(
+    version = await bump_version(session, user.id)
+    todo_db = await insert_returning(
+        session,
+        Todo,
         title=todo.title,
         description=todo.description,
         state=todo.state,
         user_id=user.id,
+        version=version,
+    )
+    await adjust_counters(session, user.id, Counter([todo.state]))
+    await session.commit()
+    await get_broker().publish(
+        user.id, todo_event('created', version, todo_db.id, todo_db)
     )
-
-    session.add(todo_db)
-    session.commit()
-    session.refresh(todo_db)
 
     return todo_db
 
 
-@router.get('/', response_model=TodoList)
-def show_todos(
-    todo_filter: Annotated[FilterTodo, Query()],
-    session: Session = Depends(get_session),
+def operation_status(operation, owned: set[int]) -> HTTPStatus:
+    if operation.op == 'create':
+        return HTTPStatus.CREATED
+    if operation.id not in owned:
+        return HTTPStatus.NOT_FOUND
+    # The columns are NOT NULL, so an explicit null fails the operation.
+    if operation.op == 'update' and None in (
+        operation.todo.model_dump(exclude_unset=True).values()
+    ):
+        return HTTPStatus.UNPROCESSABLE_ENTITY
+    return HTTPStatus.OK
+
+
+@router.post('/batch', response_model=TodoBatchResponse)
+async def batch_todos(
+    batch: TodoBatch,
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    referenced = {op.id for op in batch.operations if op.op != 'create'}
+    states = {}
+
+    if referenced:
+        states = dict(
+            (
+                await session.execute(
+                    select(Todo.id, Todo.state).where(
+                        Todo.user_id == user.id, Todo.id.in_(referenced)
+                    )
+                )
+            ).all()
+        )
+
+    owned = set(states)
+
+    results, creates, updates, deletes = [], [], {}, []
+
+    for operation in batch.operations:
+        status = operation_status(operation, owned)
+        results.append({
+            'op': operation.op,
+            'id': getattr(operation, 'id', 0),
+            'status': status,
+        })
+        if status >= HTTPStatus.BAD_REQUEST:
+            continue
+
+        if operation.op == 'create':
+            creates.append({**operation.todo.model_dump(), 'user_id': user.id})
+        elif operation.op == 'update':
+            updates.setdefault(operation.id, {'id': operation.id}).update(
+                operation.todo.model_dump(exclude_unset=True)
+            )
+        else:
+            owned.discard(operation.id)
+            deletes.append(operation.id)
+
+    rows = [row for row in updates.values() if len(row) > 1]
+    if not (creates or rows or deletes):
+        return {'results': results}
+
+    version = await bump_version(session, user.id)
+
+    if creates:
+        ids = iter(
+            await session.scalars(
+                insert(Todo).returning(Todo.id, sort_by_parameter_order=True),
+                [{**row, 'version': version} for row in creates],
+            )
+        )
+        for result in results:
+            if result['op'] == 'create':
+                result['id'] = next(ids)
+
+    if rows:
+        await session.execute(
+            update(Todo), [{**row, 'version': version} for row in rows]
+        )
+
+    if deletes:
+        await session.execute(
+            delete(Todo).where(Todo.user_id == user.id, Todo.id.in_(deletes))
+        )
+        await session.execute(
+            insert(TodoTombstone),
+            [
+                {'todo_id': id, 'user_id': user.id, 'version': version}
+                for id in deletes
+            ],
+        )
+
+    after = {row['id']: row.get('state', states[row['id']]) for row in rows}
+    after.update(dict.fromkeys(deletes))
+    deltas = transitions(states, after)
+    deltas.update(row['state'] for row in creates)
+    await adjust_counters(session, user.id, deltas)
+    await session.commit()
+
+    await get_broker().publish_many(
+        user.id,
+        [
+            todo_event(EVENTS[result['op']], version, result['id'])
+            for result in results
+            if result['status'] < HTTPStatus.BAD_REQUEST
+        ],
+    )
+
+    return {'results': results}
+
+
+def filter_todos(model, user_id: int, todo_filter: FilterTodo):
+    query = select(
+        model.id, model.title, model.description, model.state
+    ).where(model.user_id == user_id)
 
     if todo_filter.title:
-        query = query.filter(Todo.title.contains(todo_filter.title))
+        query = query.filter(model.title.contains(todo_filter.title))
 
     if todo_filter.description:
         query = query.filter(
-            Todo.description.contains(todo_filter.description)
+            model.description.contains(todo_filter.description)
         )
 
     if todo_filter.state:
-        query = query.filter(Todo.state == todo_filter.state)
+        query = query.filter(model.state == todo_filter.state)
+
+    return query
 
-    todos = session.scalars(
-        query.offset(todo_filter.offset).limit(todo_filter.limit)
-    ).all()
 
-    return {'todos': todos}
+@router.get('/', response_model=TodoList, dependencies=[query_budget(3)])
+async def show_todos(
+    todo_filter: Annotated[FilterTodo, Query()],
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(get_current_user),
+):
+    etag = make_etag(request, user.id, await get_version(session, user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
+    query = filter_todos(Todo, user.id, todo_filter)
+    key = Todo.id
+
+    if todo_filter.include_archived:
+        combined = union_all(
+            query, filter_todos(TodoArchive, user.id, todo_filter)
+        ).subquery()
+        query, key = select(combined), combined.c.id
+
+    todos, next_cursor = await paginate(session, query, key, todo_filter)
+
+    return FastJSONResponse(
+        {'todos': todos, 'next_cursor': next_cursor}, headers={'ETag': etag}
+    )
 
-@router.patch('/{id}', response_model=TodoResponse)
-def update_todo(
+
+@router.get('/search', response_model=TodoList, dependencies=[query_budget(2)])
+async def search_todos(
+    search: Annotated[FilterSearch, Query()],
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(get_current_user),
+):
+    backend = get_backend(session.get_bind().dialect.name)
+    query = backend.search(
+        select(*COLUMNS).where(Todo.user_id == user.id), search.q
+    )
+
+    rows = await session.execute(query.limit(search.limit))
+
+    return FastJSONResponse({
+        'todos': [row._asdict() for row in rows],
+        'next_cursor': None,
+    })
+
+
+@router.get('/stats', response_model=TodoStats, dependencies=[query_budget(2)])
+async def todo_stats(
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(get_current_user),
+):
+    counts = await get_counters(session, user.id)
+
+    return {'counts': counts, 'total': sum(counts.values())}
+
+
+@router.get(
+    '/changes', response_model=TodoChanges, dependencies=[query_budget(4)]
+)
+async def todo_changes(
+    changes: Annotated[FilterChanges, Query()],
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(get_current_user),
+):
+    # Writes stamp todos and tombstones with the owner's new version, so
+    # the version read on the first page is the token for the next sync.
+    # Later pages carry it in the cursor.
+    last = None
+    if changes.since:
+        (last,) = decode_token(
+            changes.since, ('version',), 'Invalid sync token'
+        )
+    if changes.cursor:
+        after, version = decode_token(
+            changes.cursor, ('id', 'version'), 'Invalid cursor'
+        )
+    else:
+        after, version = 0, await get_version(session, user.id)
+
+    todos, deleted, next_cursor = [], [], None
+
+    if last is None or version > last:
+        query = select(*COLUMNS).where(
+            Todo.user_id == user.id, Todo.id > after
+        )
+        if last is not None:
+            query = query.where(Todo.version > last)
+        if last is not None and not changes.cursor:
+            deleted = list(
+                await session.scalars(
+                    select(TodoTombstone.todo_id)
+                    .where(
+                        TodoTombstone.user_id == user.id,
+                        TodoTombstone.version > last,
+                    )
+                    .order_by(TodoTombstone.todo_id)
+                )
+            )
+        rows = (
+            await session.execute(
+                query.order_by(Todo.id).limit(changes.limit + 1)
+            )
+        ).all()
+        todos = [row._asdict() for row in rows[: changes.limit]]
+        if len(rows) > changes.limit and todos:
+            next_cursor = encode_token(id=todos[-1]['id'], version=version)
+
+    return FastJSONResponse({
+        'todos': todos,
+        'deleted': deleted,
+        'token': encode_token(version=version),
+        'next_cursor': next_cursor,
+    })
+
+
+@router.get(
+    '/stream',
+    response_class=StreamingResponse,
+    dependencies=[query_budget(1)],
+)
+async def stream(user: User = Depends(get_current_user)):
+    return StreamingResponse(
+        stream_events(get_broker(), user.id, get_settings().STREAM_HEARTBEAT),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache'},
+    )
+
+
+@router.get(
+    '/export', response_class=StreamingResponse, dependencies=[query_budget(2)]
+)
+async def export(
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    session_factory=Depends(get_session_factory),
+    user: User = Depends(get_current_user),
+):
+    return StreamingResponse(
+        export_todos(session_factory, user.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': f'attachment; filename="todos.{format}"'
+        },
+    )
+
+
+@router.patch(
+    '/{id}', response_model=TodoResponse, dependencies=[query_budget(6)]
+)
+async def update_todo(
     id: int,
     todo: TodoUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    todo_db = session.scalar(
+    todo_db = await session.scalar(
         select(Todo).where(Todo.user_id == user.id, Todo.id == id)
     )
 
@@ -82,23 +373,35 @@ def update_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
         )
 
+    previous_state = todo_db.state
+    todo_db.version = await bump_version(session, user.id)
     for key, valeu in todo.model_dump(exclude_unset=True).items():
         setattr(todo_db, key, valeu)
 
+    if todo_db.state != previous_state:
+        await adjust_counters(
+            session,
+            user.id,
+            Counter({previous_state: -1, todo_db.state: 1}),
+        )
+
     session.add(todo_db)
-    session.commit()
-    session.refresh(todo_db)
+    await session.commit()
+    await session.refresh(todo_db)
+    await get_broker().publish(
+        user.id, todo_event('updated', todo_db.version, id, todo_db)
+    )
 
     return todo_db
 
 
-@router.delete('/{id}', response_model=Message)
-def delete_todo(
+@router.delete('/{id}', response_model=Message, dependencies=[query_budget(6)])
+async def delete_todo(
     id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    todo = session.scalar(
+    todo = await session.scalar(
         select(Todo).where(Todo.user_id == user.id, Todo.id == id)
     )
 
@@ -107,7 +410,11 @@ def delete_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
         )
 
-    session.delete(todo)
-    session.commit()
+    version = await bump_version(session, user.id)
+    await session.delete(todo)
+    session.add(TodoTombstone(todo_id=id, user_id=user.id, version=version))
+    await adjust_counters(session, user.id, Counter({todo.state: -1}))
+    await session.commit()
+    await get_broker().publish(user.id, todo_event('deleted', version, id))
 
     return {'message': 'Task has been deleted successfully'}
@@ -1,29 +1,51 @@
 from http import HTTPStatus
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from todo_list.database import get_session
+from todo_list.database import (
+    get_read_session,
+    get_session,
+    get_session_factory,
+    insert_returning,
+)
+from todo_list.etag import bump_version, etag_matches, make_etag, not_modified
+from todo_list.metrics import TimedRoute, query_budget
 from todo_list.models import User
+from todo_list.pagination import paginate
+from todo_list.responses import FastJSONResponse
 from todo_list.schemas import (
+    FilterPage,
     Message,
     UserResponse,
     UserSchema,
     UsersResponse,
 )
 from todo_list.security import (
+    get_admin_user,
     get_current_user,
-    get_password_hash,
+    hash_password,
+    principal_cache,
 )
+from todo_list.user_import import import_users, parse_users, to_ndjson
 
-router = APIRouter(prefix='/users', tags=['users'])
+router = APIRouter(prefix='/users', tags=['users'], route_class=TimedRoute)
 
 
-@router.post('/', status_code=HTTPStatus.CREATED, response_model=UserResponse)
-def create_user(user: UserSchema, session: Session = Depends(get_session)):
-    user_db = session.scalar(
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=UserResponse,
+    dependencies=[query_budget(3)],
+)
+async def create_user(
+    user: UserSchema, session: AsyncSession = Depends(get_session)
+):
+    user_db = await session.scalar(
         select(User).where(
             (User.username == user.username) | (User.email == user.email)
         )
@@ -41,43 +63,84 @@ def create_user(user: UserSchema, session: Session = Depends(get_session)):
                 detail='Email already exists',
             )
 
-    user_db = User(
+    user_db = await insert_returning(
+        session,
+        User,
         username=user.username,
-        password=get_password_hash(user.password),
+        password=await hash_password(user.password),
         email=user.email,
     )
-
-    session.add(user_db)
-    session.commit()
-    session.refresh(user_db)
+    await session.commit()
 
     return user_db
 
 
-@router.get('/', response_model=UsersResponse)
-def users(
-    skip: int = 0, limit: int = 100, session: Session = Depends(get_session)
+@router.post('/import', response_class=StreamingResponse)
+async def bulk_import(
+    request: Request,
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    session_factory=Depends(get_session_factory),
+    admin: User = Depends(get_admin_user),
+):
+    # Read up front: the response cannot read the body while streaming.
+    try:
+        text = (await request.body()).decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Request body must be UTF-8 text',
+        )
+
+    return StreamingResponse(
+        to_ndjson(import_users(session_factory, parse_users(text, format))),
+        media_type='application/x-ndjson',
+    )
+
+
+@router.get('/', response_model=UsersResponse, dependencies=[query_budget(1)])
+async def users(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
 ):
-    users = session.scalars(select(User).offset(skip).limit(limit)).all()
-    return {'users': users}
+    page = FilterPage(offset=skip, limit=limit, cursor=cursor)
+    users, next_cursor = await paginate(
+        session, select(User.id, User.username, User.email), User.id, page
+    )
+    return FastJSONResponse({'users': users, 'next_cursor': next_cursor})
 
 
-@router.get('/{id}', response_model=UserResponse)
-def user(id: int, session: Session = Depends(get_session)):
-    user = session.scalar(select(User).where(User.id == id))
+@router.get(
+    '/{id}', response_model=UserResponse, dependencies=[query_budget(1)]
+)
+async def user(
+    id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
+):
+    user = await session.scalar(select(User).where(User.id == id))
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User Not Found'
         )
 
+    etag = make_etag(request, user.id, user.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers['ETag'] = etag
+
     return user
 
 
-@router.put('/{id}', response_model=UserResponse)
-def update_user(
+@router.put(
+    '/{id}', response_model=UserResponse, dependencies=[query_budget(4)]
+)
+async def update_user(
     id: int,
     user: UserSchema,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     curret_user: User = Depends(get_current_user),
 ):
     if curret_user.id != id:
@@ -87,10 +150,12 @@ def update_user(
 
     try:
         curret_user.username = user.username
-        curret_user.password = get_password_hash(user.password)
+        curret_user.password = await hash_password(user.password)
         curret_user.email = user.email
-        session.commit()
-        session.refresh(curret_user)
+        await bump_version(session, id)
+        await session.commit()
+        principal_cache.invalidate_user(id)
+        await session.refresh(curret_user)
 
         return curret_user
     except IntegrityError:
@@ -100,10 +165,10 @@ def update_user(
         )
 
 
-@router.delete('/{id}', response_model=Message)
-def delete_user(
+@router.delete('/{id}', response_model=Message, dependencies=[query_budget(2)])
+async def delete_user(
     id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.id != id:
@@ -111,7 +176,8 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
-    session.delete(current_user)
-    session.commit()
+    await session.delete(current_user)
+    await session.commit()
+    principal_cache.invalidate_user(id)
 
     return {'message': 'User deleted'}
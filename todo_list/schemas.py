@@ -1,4 +1,12 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Annotated, Literal
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    StringConstraints,
+)
 
 from todo_list.models import TodoState
 
@@ -22,6 +30,7 @@ class UserResponse(BaseModel):
 
 class UsersResponse(BaseModel):
     users: list[UserResponse]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -51,14 +60,89 @@ class TodoResponse(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoResponse]
+    next_cursor: str | None = None
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoResponse]
+    deleted: list[int]
+    token: str
+    next_cursor: str | None = None
+
+
+class TodoStats(BaseModel):
+    counts: dict[TodoState, int]
+    total: int
+
+
+class TodoCreateOperation(BaseModel):
+    op: Literal['create']
+    todo: TodoSchema
+
+
+class TodoUpdateOperation(BaseModel):
+    op: Literal['update']
+    id: int
+    todo: TodoUpdate
+
+
+class TodoDeleteOperation(BaseModel):
+    op: Literal['delete']
+    id: int
+
+
+TodoOperation = Annotated[
+    TodoCreateOperation | TodoUpdateOperation | TodoDeleteOperation,
+    Field(discriminator='op'),
+]
+
+
+class TodoBatch(BaseModel):
+    operations: list[TodoOperation] = Field(min_length=1, max_length=1000)
+
+
+class TodoOperationResult(BaseModel):
+    op: str
+    id: int
+    status: int
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoOperationResult]
 
 
 class FilterPage(BaseModel):
     offset: int = 0
     limit: int = 100
+    cursor: str | None = None
 
 
 class FilterTodo(FilterPage):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+    include_archived: bool = False
+
+
+class FilterChanges(BaseModel):
+    since: str | None = None
+    cursor: str | None = None
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class FilterSearch(BaseModel):
+    q: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class PoolStatus(BaseModel):
+    pool: str
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    max_overflow: int | None = None
+    timeouts: int | None = None
+    wait_count: int | None = None
+    wait_seconds_sum: float | None = None
+    wait_seconds: dict[str, int] | None = None
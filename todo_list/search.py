@@ -0,0 +1,159 @@
+from abc import ABC, abstractmethod
+
+from sqlalchemy import (
+    Connection,
+    Select,
+    column,
+    event,
+    func,
+    literal_column,
+    or_,
+    table,
+    text,
+)
+
+from todo_list.models import Todo
+
+
+class SearchBackend(ABC):
+    """Full-text search over todo titles and descriptions.
+
+    `ddl` creates whatever the dialect needs next to the `todos` table and
+    `drop_ddl` removes it; `search` narrows a `select(Todo)` to the matches
+    of `terms`, best match first.
+    """
+
+    ddl: tuple[str, ...] = ()
+    drop_ddl: tuple[str, ...] = ()
+
+    def install(self, connection: Connection) -> None:
+        for statement in self.ddl:
+            connection.execute(text(statement))
+
+    def uninstall(self, connection: Connection) -> None:
+        for statement in self.drop_ddl:
+            connection.execute(text(statement))
+
+    @abstractmethod
+    def search(self, query: Select, terms: str) -> Select: ...
+
+
+class LikeSearchBackend(SearchBackend):
+    """Fallback for dialects without a backend: unranked `LIKE` scan."""
+
+    @staticmethod
+    def search(query, terms):
+        return query.where(
+            or_(Todo.title.contains(terms), Todo.description.contains(terms))
+        ).order_by(Todo.id)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 index kept in sync with `todos` by triggers, ranked by bm25."""
+
+    ddl = (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+            title, description, content='todos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS todos_fts_insert
+        AFTER INSERT ON todos BEGIN
+            INSERT INTO todos_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS todos_fts_delete
+        AFTER DELETE ON todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS todos_fts_update
+        AFTER UPDATE OF title, description ON todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO todos_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+    )
+    drop_ddl = (
+        'DROP TRIGGER IF EXISTS todos_fts_insert',
+        'DROP TRIGGER IF EXISTS todos_fts_delete',
+        'DROP TRIGGER IF EXISTS todos_fts_update',
+        'DROP TABLE IF EXISTS todos_fts',
+    )
+    fts = table('todos_fts', column('rowid'), column('rank'))
+
+    @staticmethod
+    def match_expression(terms: str) -> str:
+        # Quote every word so user input is never parsed as FTS5 syntax.
+        words = (
+            '"{}"'.format(word.replace('"', '""')) for word in terms.split()
+        )
+        return ' '.join(words)
+
+    def search(self, query, terms):
+        return (
+            query.join(self.fts, self.fts.c.rowid == Todo.id)
+            .where(
+                literal_column('todos_fts').match(self.match_expression(terms))
+            )
+            .order_by(self.fts.c.rank, Todo.id)
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """`tsvector` match served by a GIN expression index, ranked by ts_rank."""
+
+    ddl = (
+        """
+        CREATE INDEX IF NOT EXISTS ix_todos_search ON todos
+        USING gin (to_tsvector('simple', title || ' ' || description))
+        """,
+    )
+    drop_ddl = ('DROP INDEX IF EXISTS ix_todos_search',)
+
+    # Spelled exactly as in the index so the planner can use it.
+    document = literal_column(
+        "to_tsvector('simple', todos.title || ' ' || todos.description)"
+    )
+
+    def search(self, query, terms):
+        document = self.document
+        tsquery = func.plainto_tsquery(literal_column("'simple'"), terms)
+        return query.where(document.op('@@')(tsquery)).order_by(
+            func.ts_rank(document, tsquery).desc(), Todo.id
+        )
+
+
+backends: dict[str, SearchBackend] = {
+    'sqlite': SQLiteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+
+
+def register_backend(dialect: str, backend: SearchBackend) -> None:
+    if not isinstance(backend, SearchBackend):
+        raise TypeError(f'{backend!r} is not a SearchBackend')
+    backends[dialect] = backend
+
+
+def get_backend(dialect: str) -> SearchBackend:
+    return backends.get(dialect, LikeSearchBackend())
+
+
+@event.listens_for(Todo.__table__, 'after_create')
+def install_search(target, connection, **kw):
+    get_backend(connection.dialect.name).install(connection)
+
+
+@event.listens_for(Todo.__table__, 'before_drop')
+def uninstall_search(target, connection, **kw):
+    get_backend(connection.dialect.name).uninstall(connection)
@@ -1,25 +1,71 @@
+import asyncio
 from datetime import datetime, timedelta
+from functools import cache
 from http import HTTPStatus
+from itertools import chain
+from math import ceil
+from secrets import compare_digest
 
 from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBearer,
+    OAuth2PasswordBearer,
+)
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from zoneinfo import ZoneInfo
 
+from todo_list.cache import PrincipalCache
 from todo_list.database import get_session
+from todo_list.hashing import HashingExecutor
+from todo_list.metrics import timed
 from todo_list.models import User
+from todo_list.ratelimit import TokenBucketLimiter
 from todo_list.schemas import TokenData
-from todo_list.settings import Settings
+from todo_list.settings import get_settings
 
-settings = Settings()
-pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+internal_scheme = HTTPBearer(auto_error=False)
+# Passwords per job of `hash_passwords`.
+HASH_BATCH_SIZE = 16
+principal_cache = PrincipalCache(
+    maxsize=get_settings().PRINCIPAL_CACHE_SIZE,
+    ttl=get_settings().PRINCIPAL_CACHE_TTL,
+)
+hash_executor = HashingExecutor(
+    workers=get_settings().PASSWORD_HASH_WORKERS,
+    queue_depth=get_settings().PASSWORD_HASH_QUEUE_DEPTH,
+)
+ip_limiter = TokenBucketLimiter(
+    burst=get_settings().LOGIN_IP_BURST,
+    per_minute=get_settings().LOGIN_IP_PER_MINUTE,
+    maxsize=get_settings().LOGIN_RATE_LIMIT_SIZE,
+)
+email_limiter = TokenBucketLimiter(
+    burst=get_settings().LOGIN_EMAIL_BURST,
+    per_minute=get_settings().LOGIN_EMAIL_PER_MINUTE,
+    maxsize=get_settings().LOGIN_RATE_LIMIT_SIZE,
+)
+
+
+@cache
+def get_password_hasher() -> PasswordHash:
+    settings = get_settings()
+    return PasswordHash((
+        Argon2Hasher(
+            time_cost=settings.ARGON2_TIME_COST,
+            memory_cost=settings.ARGON2_MEMORY_COST,
+            parallelism=settings.ARGON2_PARALLELISM,
+        ),
+    ))
 
 
 def create_access_token(data: dict):
+    settings = get_settings()
     to_encode = data.copy()
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
         minutes=settings.EXPIRATION_TIME
@@ -34,15 +80,108 @@ def create_access_token(data: dict):
 
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    return get_password_hasher().hash(password)
 
 
 def check_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
+def check_password_and_update(plain_password: str, hashed_password: str):
+    return get_password_hasher().verify_and_update(
+        plain_password, hashed_password
+    )
+
+
+async def hash_password(password: str):
+    return await hash_executor.run(get_password_hash, password)
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+async def hash_passwords(
+    passwords: list[str], executor: HashingExecutor = hash_executor
+) -> list[str]:
+    """Hash `passwords` in order, on every worker of `executor` at once.
+
+    Jobs of `HASH_BATCH_SIZE` passwords go out one per worker, so a bulk
+    import never fills the executor's queue and logins get a turn
+    between its jobs.
+    """
+    slots = asyncio.Semaphore(max(executor.workers, 1))
+
+    async def hash_batch(batch):
+        async with slots:
+            return await executor.run(get_password_hashes, batch)
+
+    hashed = await asyncio.gather(
+        *(
+            hash_batch(passwords[start : start + HASH_BATCH_SIZE])
+            for start in range(0, len(passwords), HASH_BATCH_SIZE)
+        )
+    )
+    return list(chain.from_iterable(hashed))
+
+
+async def verify_password(plain_password: str, hashed_password: str):
+    return await hash_executor.run(
+        check_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify, and rehash the password if it was stored with other costs."""
+    return await hash_executor.run(
+        check_password_and_update, plain_password, hashed_password
+    )
+
+
+async def save_rehashed_password(
+    session_factory, user_id: int, old_hash: str, new_hash: str
+) -> None:
+    """Store `new_hash` unless the password changed since `old_hash`."""
+    async with session_factory() as session:
+        await session.execute(
+            update(User)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
+        )
+        await session.commit()
+
+
+def check_login_rate(email: str, ip: str) -> None:
+    """Take a login attempt from the buckets of `ip` and of `email`.
+
+    Runs before the user lookup and Argon2, so a credential-stuffing
+    burst costs a dict lookup per attempt once its buckets are empty.
+    An IP over its rate does not drain the bucket of the email it tries.
+    """
+    retry_after = ip_limiter.hit(ip)
+    if not retry_after:
+        retry_after = email_limiter.hit(email.lower())
+        if retry_after:
+            ip_limiter.refund(ip)
+
+    if retry_after:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many login attempts, try again later',
+            headers={'Retry-After': str(ceil(retry_after))},
+        )
+
+
+def login_succeeded(email: str, ip: str) -> None:
+    """Refund the attempt: only failed logins count against the limits."""
+    ip_limiter.refund(ip)
+    email_limiter.refund(email.lower())
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
 ):
     credentials_exception = HTTPException(
@@ -51,10 +190,17 @@ def get_current_user(
         headers={'WW-Authenticate': 'Bearer'},
     )
 
+    cached = principal_cache.get(token)
+    if cached:
+        return await session.merge(cached, load=False)
+
     try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORIHTM]
-        )
+        with timed('jwt'):
+            payload = decode(
+                token,
+                get_settings().SECRET_KEY,
+                algorithms=[get_settings().ALGORIHTM],
+            )
         username = payload.get('sub')
 
         if not username:
@@ -66,11 +212,37 @@ def get_current_user(
     except ExpiredSignatureError:
         raise credentials_exception
 
-    user = session.scalar(
+    user = await session.scalar(
         select(User).where(User.email == token_data.username)
     )
 
     if not user:
         raise credentials_exception
 
+    principal_cache.set(token, user, payload.get('exp', float('inf')))
+
     return user
+
+
+async def get_admin_user(user: User = Depends(get_current_user)):
+    if user.email not in get_settings().ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
+        )
+
+    return user
+
+
+def check_internal_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(
+        internal_scheme
+    ),
+):
+    expected = get_settings().INTERNAL_TOKEN.encode()
+    given = credentials.credentials.encode() if credentials else b''
+    if not expected or not compare_digest(given, expected):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Could not authenticate',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
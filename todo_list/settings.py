@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,6 +9,48 @@ class Settings(BaseSettings):
     )
 
     DATABASE_URL: str
+    DATABASE_ASYNC: bool = False
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
     SECRET_KEY: str
     ALGORIHTM: str
     EXPIRATION_TIME: int
+    # Users allowed on admin routes such as POST /users/import.
+    ADMIN_EMAILS: list[str] = []
+    # Bearer token for the /internal routes; they refuse everyone if unset.
+    INTERNAL_TOKEN: str = ''
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: int = 60
+    # Argon2id costs; tune with `python -m todo_list.cli calibrate-argon2`.
+    # Logins rehash passwords stored with other costs.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_DEPTH: int = 32
+    # Failed logins per client IP and per email; a size of 0 disables.
+    LOGIN_RATE_LIMIT_SIZE: int = 10_000
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_PER_MINUTE: float = 60
+    LOGIN_EMAIL_BURST: int = 5
+    LOGIN_EMAIL_PER_MINUTE: float = 5
+    QUERY_BUDGET_ENFORCE: bool = False
+    # Log statements repeated this many times in one request; 0 disables.
+    QUERY_REPEAT_THRESHOLD: int = 0
+    # Done and trashed todos untouched for this long move to todos_archive.
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    BROKER: str = 'memory'
+    # Events kept per stream subscriber before the oldest are dropped.
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_HEARTBEAT: float = 15
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """The settings, parsed from the environment and `.env` once."""
+    return Settings()
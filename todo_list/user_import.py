@@ -0,0 +1,183 @@
+import csv
+import json
+from itertools import batched
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from todo_list.hashing import HashingExecutor
+from todo_list.models import User
+from todo_list.schemas import UserSchema
+from todo_list.security import hash_executor, hash_passwords
+
+CHUNK_SIZE = 500
+
+
+def parse_users(text: str, format: str):
+    """`(line, record)` for every user in NDJSON or CSV `text`.
+
+    CSV needs a `username,email,password` header. Lines that are not
+    JSON give a `None` record.
+    """
+    lines = text.splitlines()
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, record in enumerate(lines, 1):
+        if not record.strip():
+            continue
+        try:
+            yield line, json.loads(record)
+        except json.JSONDecodeError:
+            yield line, None
+
+
+def describe(error: ValidationError) -> str:
+    return '; '.join(
+        f'{".".join(map(str, detail["loc"])) or "user"}: {detail["msg"]}'
+        for detail in error.errors()
+    )
+
+
+async def find_taken(session, users: list[UserSchema]):
+    """Usernames and emails of `users` already in use, in one query."""
+    usernames, emails = set(), set()
+    if not users:
+        return usernames, emails
+
+    taken = await session.execute(
+        select(User.username, User.email).where(
+            or_(
+                User.username.in_([user.username for user in users]),
+                User.email.in_([user.email for user in users]),
+            )
+        )
+    )
+    for username, email in taken:
+        usernames.add(username)
+        emails.add(email)
+
+    return usernames, emails
+
+
+async def import_chunk(
+    session, records, executor: HashingExecutor
+) -> list[dict]:
+    """Create the valid, unused users of `records` in one transaction.
+
+    Returns a result per record, in order: the new user's id or the
+    reason it was skipped.
+    """
+    results, users = {}, {}
+    for line, record in records:
+        if record is None:
+            results[line] = {'line': line, 'error': 'Invalid JSON'}
+            continue
+        try:
+            users[line] = UserSchema.model_validate(record)
+        except ValidationError as error:
+            results[line] = {'line': line, 'error': describe(error)}
+
+    usernames, emails = await find_taken(session, list(users.values()))
+
+    new = {}
+    for line, user in users.items():
+        if user.username in usernames:
+            results[line] = {'line': line, 'error': 'Username already exists'}
+        elif user.email in emails:
+            results[line] = {'line': line, 'error': 'Email already exists'}
+        else:
+            new[line] = user
+            usernames.add(user.username)
+            emails.add(user.email)
+
+    if new:
+        outcomes = await create_users(session, list(new.values()), executor)
+        for line, outcome in zip(new, outcomes):
+            results[line] = {'line': line, **outcome}
+
+    return [results[line] for line in sorted(results)]
+
+
+async def create_users(
+    session, users: list[UserSchema], executor: HashingExecutor
+) -> list[dict]:
+    """Hash and insert `users`, returning each one's id or error."""
+    try:
+        passwords = await hash_passwords(
+            [user.password for user in users], executor
+        )
+    except HTTPException as error:
+        # The hashing queue is full; these rows can be sent again.
+        return [{'error': error.detail}] * len(users)
+
+    values = [
+        {'username': user.username, 'email': user.email, 'password': hashed}
+        for user, hashed in zip(users, passwords)
+    ]
+    try:
+        return [{'id': id} for id in await insert_users(session, values)]
+    except IntegrityError:
+        await session.rollback()
+
+    # Lost a race with another writer on a username or email: insert the
+    # rows one at a time so only the conflicting ones are skipped.
+    outcomes = []
+    for row in values:
+        try:
+            (id,) = await insert_users(session, [row])
+            outcomes.append({'id': id})
+        except IntegrityError:
+            await session.rollback()
+            outcomes.append({'error': 'Username or Email already exists'})
+    return outcomes
+
+
+async def insert_users(session, values: list[dict]) -> list[int]:
+    if session.get_bind().dialect.insert_returning:
+        ids = list(
+            await session.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                values,
+            )
+        )
+    else:
+        await session.execute(insert(User), values)
+        usernames = [row['username'] for row in values]
+        id_by_username = dict(
+            (
+                await session.execute(
+                    select(User.username, User.id).where(
+                        User.username.in_(usernames)
+                    )
+                )
+            ).all()
+        )
+        ids = [id_by_username[username] for username in usernames]
+    await session.commit()
+
+    return ids
+
+
+async def import_users(
+    session_factory, records, executor: HashingExecutor = hash_executor
+):
+    """Import `records` from `parse_users`, yielding results per chunk.
+
+    Each chunk costs one SELECT for duplicates, the password hashes,
+    spread over the hashing workers, and one multi-row INSERT. A chunk
+    that loses a race with another writer is inserted row by row.
+    """
+    async with session_factory() as session:
+        for chunk in batched(records, CHUNK_SIZE):
+            yield await import_chunk(session, chunk, executor)
+
+
+async def to_ndjson(results):
+    async for chunk in results:
+        yield ''.join(json.dumps(result) + '\n' for result in chunk)